@@ -0,0 +1,14 @@
+import shutil
+import tempfile
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def yatube_test_settings():
+    """То же, что core.runner.TestRunner для manage.py test."""
+    from core.runner import test_settings
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+    with test_settings(directory):
+        yield
+    shutil.rmtree(directory, ignore_errors=True)
@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
+
+
+def clear_cache(sender, **kwargs):
+    # Кэш общий для процессов и переживает перезапуск: после миграций
+    # (в том числе тестовой базы) его содержимое может быть устаревшим.
+    from django.core.cache import cache
+    cache.clear()
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        post_migrate.connect(clear_cache, sender=self)
+        if settings.TEMPLATE_PROFILING:
+            from .profiling import install
+            install()
@@ -0,0 +1,274 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed INTEGER NOT NULL,'
+    ' size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+    ' total INTEGER NOT NULL,'
+    ' entries INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_stats (id, total, entries) '
+    'VALUES (1, 0, 0)',
+)
+# Ограничение SQLite на число параметров в одном запросе.
+MAX_VARIABLES = 500
+# Вытесняем с запасом, чтобы не чистить кэш на каждой записи.
+CULL_TARGET = 0.9
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кэш в файле SQLite, общий для всех процессов WSGI на хосте.
+
+    Вытеснение — LRU по отметке последнего чтения в пределах
+    OPTIONS['MAX_BYTES'] байт и MAX_ENTRIES записей. Запись идёт
+    в транзакции BEGIN IMMEDIATE, поэтому incr атомарен между процессами,
+    а get_many/set_many выполняются одним запросом/транзакцией.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._location = location
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 30))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Соединение на поток; после fork дочерний процесс открывает своё.
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self._location,
+                                 timeout=self._busy_timeout,
+                                 isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            with _Transaction(db):
+                for statement in SCHEMA:
+                    db.execute(statement)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _write(self, db, key, value, timeout, mode):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        row = db.execute(
+            'SELECT size, expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        now = time.time()
+        alive = row is not None and (row[1] is None or row[1] > now)
+        if mode == 'add' and alive:
+            return False
+        if mode == 'touch':
+            if not alive:
+                return False
+            db.execute('UPDATE cache SET expires = ? WHERE key = ?',
+                       (self.get_backend_timeout(timeout), key))
+            return True
+        db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed, '
+            'size) VALUES (?, ?, ?, ?, ?)',
+            (key, blob, self.get_backend_timeout(timeout), time.time_ns(),
+             len(blob)),
+        )
+        if row is None:
+            self._adjust(db, len(blob), 1)
+        else:
+            self._adjust(db, len(blob) - row[0], 0)
+        return True
+
+    def _adjust(self, db, total, entries):
+        db.execute(
+            'UPDATE cache_stats SET total = total + ?, entries = entries + ? '
+            'WHERE id = 1',
+            (total, entries),
+        )
+
+    def _cull(self, db):
+        total, entries = db.execute(
+            'SELECT total, entries FROM cache_stats WHERE id = 1'
+        ).fetchone()
+        if total <= self._max_bytes and entries <= self._max_entries:
+            return
+        now = time.time()
+        freed, removed = db.execute(
+            'SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache '
+            'WHERE expires <= ?',
+            (now,),
+        ).fetchone()
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        total -= freed
+        entries -= removed
+        byte_goal = self._max_bytes * CULL_TARGET
+        entry_goal = self._max_entries * CULL_TARGET
+        victims = []
+        for key, size in db.execute(
+            'SELECT key, size FROM cache ORDER BY accessed'
+        ):
+            if total <= byte_goal and entries <= entry_goal:
+                break
+            victims.append((key,))
+            total -= size
+            entries -= 1
+        db.executemany('DELETE FROM cache WHERE key = ?', victims)
+        db.execute(
+            'UPDATE cache_stats SET total = ?, entries = ? WHERE id = 1',
+            (total, entries),
+        )
+
+    def _store(self, key, value, timeout, version, mode):
+        key = self._key(key, version)
+        db = self._db
+        with _Transaction(db):
+            stored = self._write(db, key, value, timeout, mode)
+            if stored and mode != 'touch':
+                self._cull(db)
+        return stored
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, value, timeout, version, 'add')
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(key, value, timeout, version, 'set')
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, None, timeout, version, 'touch')
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_rows([key]).get(key, default)
+
+    def _get_rows(self, keys):
+        db = self._db
+        found = {}
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = db.execute(
+                f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                (*chunk, time.time()),
+            ).fetchall()
+            found.update(rows)
+        if found:
+            self._mark_read(db, list(found))
+        return {key: pickle.loads(value) for key, value in found.items()}
+
+    def _mark_read(self, db, keys):
+        """Отметка чтения для LRU; занятость БД не должна ронять get."""
+        stamp = time.time_ns()
+        try:
+            for start in range(0, len(keys), MAX_VARIABLES):
+                chunk = keys[start:start + MAX_VARIABLES]
+                db.execute(
+                    f'UPDATE cache SET accessed = ? '
+                    f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                    (stamp, *chunk),
+                )
+        except sqlite3.OperationalError:
+            pass
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        found = self._get_rows(list(key_map))
+        return {key_map[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        db = self._db
+        with _Transaction(db):
+            for key, value in data.items():
+                self._write(db, self._key(key, version), value, timeout,
+                            'set')
+            self._cull(db)
+        return []
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with _Transaction(db):
+            row = db.execute(
+                'SELECT value, size FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                (blob, len(blob), time.time_ns(), key),
+            )
+            self._adjust(db, len(blob) - row[1], 0)
+            self._cull(db)
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        db = self._db
+        with _Transaction(db):
+            for key in keys:
+                row = db.execute(
+                    'SELECT size FROM cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    continue
+                db.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self._adjust(db, -row[0], -1)
+
+    def clear(self):
+        db = self._db
+        with _Transaction(db):
+            db.execute('DELETE FROM cache')
+            db.execute(
+                'UPDATE cache_stats SET total = 0, entries = 0 WHERE id = 1'
+            )
+
+    def close(self, **kwargs):
+        # Соединение живёт весь срок процесса, как у LocMemCache.
+        pass
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT: блокировка на запись берётся сразу."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
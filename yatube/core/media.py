@@ -0,0 +1,147 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import http_date, quote_etag
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+
+MEDIA_SERVER = settings.MEDIA_SERVER
+MEDIA_ACCEL_PREFIX = settings.MEDIA_ACCEL_PREFIX
+MEDIA_MAX_AGE = settings.MEDIA_MAX_AGE
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# Имена по хэшу содержимого (хранилище постов, варианты, кэш sorl)
+# никогда не меняют содержимое.
+HASHED_NAME = re.compile(r'(^|[^0-9a-f])[0-9a-f]{32,}([^0-9a-f]|$)')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    Файл, ограниченный отрезком [start, start + length). Сервер
+    с wsgi.file_wrapper (gunicorn, uWSGI) отдаёт его через os.sendfile
+    с текущей позиции на Content-Length байт, остальные читают через
+    read, который не выходит за отрезок.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, length) для одного отрезка bytes=; None — отдать файл
+    целиком, ValueError — отрезок за пределами файла.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = min(int(last), size)
+        if not length:
+            raise ValueError(header)
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def cache_control(path):
+    if HASHED_NAME.search(os.path.basename(path)):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={MEDIA_MAX_AGE}'
+
+
+def resolve(root, path):
+    """Полный путь к обычному файлу внутри root или Http404."""
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if os.path.basename(path).startswith('.') or not os.path.isfile(
+        full_path
+    ):
+        raise Http404
+    return full_path
+
+
+def serve_media(request, path):
+    """
+    Отдаёт файл из MEDIA_ROOT. При MEDIA_SERVER = 'nginx' или 'apache'
+    передаёт отдачу фронт-серверу (X-Accel-Redirect / X-Sendfile,
+    путь в заголовке URL-кодирован), иначе отдаёт сам: ETag, 304,
+    один отрезок Range и Cache-Control immutable для имён с хэшем.
+    """
+    full_path = resolve(settings.MEDIA_ROOT, path)
+    stat = os.stat(full_path)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if MEDIA_SERVER == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = MEDIA_ACCEL_PREFIX + quote(path)
+    elif MEDIA_SERVER == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = quote(full_path)
+    else:
+        response = stream(request, full_path, stat, content_type)
+    if response.status_code != 416:
+        response['Cache-Control'] = cache_control(path)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def stream(request, full_path, stat, content_type):
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag, last_modified)
+    if response is not None:
+        return response
+    size = stat.st_size
+    window = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' in request.META and if_range in (None, etag):
+        try:
+            window = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    file = open(full_path, 'rb')
+    if window is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, length = window
+        response = FileResponse(RangeFile(file, start, length),
+                                status=206, content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    return response
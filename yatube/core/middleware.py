@@ -0,0 +1,102 @@
+import logging
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse
+
+from .profiling import TemplateProfile
+from .queries import QueryBudgetExceeded, QueryRecorder, QueryReport
+
+logger = logging.getLogger('core.queries')
+template_logger = logging.getLogger('core.templates')
+TEMPLATE_PROFILING = settings.TEMPLATE_PROFILING
+
+
+class QueryBudgetMiddleware:
+    """
+    Записывает SQL каждого запроса, сравнивает количество с бюджетом
+    представления из QUERY_BUDGETS и находит повторяющиеся формы
+    запросов (N+1). Превышение пишется в лог, а при
+    QUERY_BUDGET_STRICT приводит к исключению.
+    Работает только при QUERY_RECORDING.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_RECORDING:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        if response.streaming and not isinstance(response, FileResponse):
+            # Потоковая страница выполняет запросы, пока отдаётся:
+            # отчёт строится после последнего фрагмента.
+            response.streaming_content = self.record_stream(
+                request, response, response.streaming_content, recorder
+            )
+            return response
+        self.report(request, response, recorder)
+        return response
+
+    @contextmanager
+    def recording(self, recorder):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield
+
+    def record_stream(self, request, response, content, recorder):
+        with self.recording(recorder):
+            yield from content
+        self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        report = QueryReport(view_name, recorder.statements,
+                             settings.QUERY_BUDGETS.get(view_name))
+        response.query_report = report
+        if report.over_budget or report.repeated:
+            logger.warning(report.describe())
+        if report.over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(report.describe())
+
+
+class TemplateProfileMiddleware:
+    """
+    При TEMPLATE_PROFILING замеряет время отрисовки шаблонов и тегов,
+    пишет отчёт в лог core.templates и в заголовок Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not TEMPLATE_PROFILING:
+            return self.get_response(request)
+        profile = TemplateProfile()
+        with profile.active():
+            response = self.get_response(request)
+        response.template_profile = profile
+        if response.streaming and not isinstance(response, FileResponse):
+            # Заголовки потоковой страницы уже не изменить.
+            response.streaming_content = self.profile_stream(
+                request, profile, response.streaming_content
+            )
+            return response
+        response['Server-Timing'] = profile.server_timing()
+        self.report(request, profile)
+        return response
+
+    def profile_stream(self, request, profile, content):
+        with profile.active():
+            yield from content
+        self.report(request, profile)
+
+    def report(self, request, profile):
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        template_logger.info(profile.describe(view_name))
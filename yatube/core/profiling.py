@@ -0,0 +1,125 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.template.base import Node, Template, TokenType
+
+# Сколько самых долгих шаблонов и тегов попадает в отчёт.
+PROFILE_TOP = 5
+
+_local = threading.local()
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def tag_name(node):
+    """Имя тега для узла {% ... %}, для остальных — имя класса узла."""
+    token = getattr(node, 'token', None)
+    if token is not None and token.token_type == TokenType.BLOCK:
+        return token.contents.split(None, 1)[0]
+    return type(node).__name__
+
+
+class TemplateProfile:
+    """
+    Время отрисовки за один запрос: по шаблонам — вместе
+    с вложенными (extends, include), по тегам — собственное,
+    без дочерних узлов, поэтому сумма по тегам равна общему времени.
+    """
+
+    def __init__(self):
+        self.templates = defaultdict(lambda: [0, 0.0])
+        self.tags = defaultdict(lambda: [0, 0.0])
+        self._children = [0.0]
+
+    @contextmanager
+    def active(self):
+        previous = current_profile()
+        _local.profile = self
+        try:
+            yield self
+        finally:
+            _local.profile = previous
+
+    def add_template(self, name, seconds):
+        entry = self.templates[name or '<string>']
+        entry[0] += 1
+        entry[1] += seconds
+
+    def time_node(self, node, render, context):
+        self._children.append(0.0)
+        started = perf_counter()
+        try:
+            return render(node, context)
+        finally:
+            elapsed = perf_counter() - started
+            children = self._children.pop()
+            self._children[-1] += elapsed
+            entry = self.tags[tag_name(node)]
+            entry[0] += 1
+            entry[1] += elapsed - children
+
+    @property
+    def total(self):
+        return self._children[0]
+
+    def top(self, entries):
+        return sorted(entries.items(), key=lambda item: -item[1][1])[
+            :PROFILE_TOP
+        ]
+
+    def describe(self, view_name):
+        lines = [f'{view_name}: шаблоны {self.total * 1000:.1f} мс']
+        for title, entries in (('шаблон', self.templates),
+                               ('тег', self.tags)):
+            lines.extend(
+                f'  {title} {name}: {count} x, {seconds * 1000:.2f} мс'
+                for name, (count, seconds) in self.top(entries)
+            )
+        return '\n'.join(lines)
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing для инструментов браузера."""
+        metrics = [f'tpl;desc="templates";dur={self.total * 1000:.2f}']
+        for prefix, entries in (('tpl', self.templates), ('tag', self.tags)):
+            metrics.extend(
+                f'{prefix}{number};desc="{name}";dur={seconds * 1000:.2f}'
+                for number, (name, (_, seconds)) in enumerate(
+                    self.top(entries), 1
+                )
+            )
+        return ', '.join(metrics)
+
+
+def install():
+    """
+    Подключает замеры к Template._render и Node.render_annotated.
+    Без активного профиля обёртки сразу вызывают исходные методы.
+    """
+    if getattr(Node.render_annotated, 'profiled', False):
+        return
+    render_template = Template._render
+    render_node = Node.render_annotated
+
+    def _render(self, context):
+        profile = current_profile()
+        if profile is None:
+            return render_template(self, context)
+        started = perf_counter()
+        try:
+            return render_template(self, context)
+        finally:
+            profile.add_template(self.name, perf_counter() - started)
+
+    def render_annotated(self, context):
+        profile = current_profile()
+        if profile is None:
+            return render_node(self, context)
+        return profile.time_node(self, render_node, context)
+
+    render_annotated.profiled = True
+    Template._render = _render
+    Node.render_annotated = render_annotated
@@ -0,0 +1,73 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LISTS = re.compile(r'\bIN \((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    """SQL без литералов: запросы, отличающиеся лишь параметрами, совпадают."""
+    shape = STRINGS.sub('?', sql)
+    shape = NUMBERS.sub('?', shape)
+    shape = IN_LISTS.sub('IN (...)', shape)
+    return SPACES.sub(' ', shape).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper, запоминающий каждый выполненный SQL-запрос."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+
+class QueryReport:
+    def __init__(self, view_name, statements, budget=None):
+        self.view_name = view_name
+        self.statements = statements
+        self.budget = budget
+        self.shapes = Counter(query_shape(sql) for sql in statements)
+
+    @property
+    def total(self):
+        return len(self.statements)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.total > self.budget
+
+    @property
+    def repeated(self):
+        """Формы запросов, повторённые не реже QUERY_REPEAT_THRESHOLD раз."""
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count >= settings.QUERY_REPEAT_THRESHOLD]
+
+    def describe(self):
+        lines = [f'{self.view_name}: {self.total} запросов '
+                 f'при бюджете {self.budget}']
+        lines.extend(f'  {count} x {shape}' for shape, count in self.repeated)
+        return '\n'.join(lines)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def check_query_budget(response):
+    """
+    Для тестов: падает, если запрос к представлению превысил бюджет
+    из settings.QUERY_BUDGETS. Отчёт кладёт QueryBudgetMiddleware.
+    """
+    report = getattr(response, 'query_report', None)
+    if report is None:
+        raise AssertionError('QueryBudgetMiddleware не записал отчёт')
+    if report.over_budget:
+        raise AssertionError(report.describe())
+    return report
@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def test_settings(directory):
+    """
+    Настройки на время тестов: кэш в файле внутри directory, чтобы
+    cache.clear() и post_migrate не трогали рабочий, строгие
+    бюджеты запросов на любой странице и ожидание миниатюр
+    в конце каждого запроса.
+    """
+    return override_settings(
+        CACHES={'default': {
+            **settings.CACHES['default'],
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        }},
+        QUERY_RECORDING=True,
+        QUERY_BUDGET_STRICT=True,
+        THUMBNAIL_WAIT=True,
+    )
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='yatube-cache-')
+        self.test_settings = test_settings(self.cache_dir)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,116 @@
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.files.base import ContentFile
+from django.utils.cache import (
+    patch_cache_control, patch_response_headers, patch_vary_headers
+)
+from django.utils.functional import cached_property
+
+from .media import IMMUTABLE_MAX_AGE, resolve, stream
+
+STATIC_MAX_AGE = settings.STATIC_MAX_AGE
+# Форматы, которые сжимаются; картинки и шрифты woff уже сжаты.
+GZIP_EXTENSIONS = ('.css', '.js', '.map', '.json', '.svg', '.txt', '.xml',
+                   '.html', '.ico', '.ttf', '.otf', '.eot')
+# Для совсем маленьких файлов заголовки gzip съедают выигрыш.
+GZIP_MIN_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище для collectstatic: имена с хэшем содержимого, манифест
+    staticfiles.json и рядом с каждым текстовым файлом копия .gz
+    с максимальным сжатием.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            compressed = self.compress(name)
+            if compressed:
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Пишет name.gz, если сжатие имеет смысл; возвращает его имя."""
+        if not name.endswith(GZIP_EXTENSIONS):
+            return None
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < GZIP_MIN_SIZE:
+            return None
+        # mtime=0: одинаковое содержимое даёт одинаковые байты архива.
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) >= len(data):
+            return None
+        gz_name = f'{name}.gz'
+        if self.exists(gz_name):
+            self.delete(gz_name)
+        self._save(gz_name, ContentFile(compressed))
+        return gz_name
+
+    def stored_name(self, name):
+        # До первого collectstatic (разработка, тесты) манифеста нет:
+        # ссылаемся на исходные имена, а не падаем на каждом шаблоне.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    @cached_property
+    def fingerprinted(self):
+        return frozenset(self.hashed_files.values())
+
+
+def accepts_gzip(header):
+    """Разрешает ли Accept-Encoding ответ в gzip (с учётом q=0)."""
+    weights = {}
+    for token in header.split(','):
+        coding, _, params = token.partition(';')
+        weight = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    return weights.get('gzip', weights.get('*', 0.0)) > 0
+
+
+def serve_static(request, path):
+    """
+    Отдаёт собранную статику из STATIC_ROOT. Если клиент принимает gzip
+    и рядом лежит .gz, отдаётся сжатая копия. Имена из манифеста
+    кэшируются на год как immutable, остальные — на STATIC_MAX_AGE.
+    """
+    full_path = resolve(settings.STATIC_ROOT, path)
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    gz_path = f'{full_path}.gz'
+    has_gzip = os.path.isfile(gz_path)
+    encoding = None
+    if has_gzip and accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING',
+                                                  '')):
+        full_path, encoding = gz_path, 'gzip'
+    response = stream(request, full_path, os.stat(full_path), content_type)
+    if has_gzip:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if response.status_code == 416:
+        return response
+    if encoding:
+        response['Content-Encoding'] = encoding
+    fingerprinted = path in getattr(staticfiles_storage, 'fingerprinted',
+                                    ())
+    max_age = IMMUTABLE_MAX_AGE if fingerprinted else STATIC_MAX_AGE
+    patch_response_headers(response, max_age)
+    patch_cache_control(response, public=True)
+    if fingerprinted:
+        patch_cache_control(response, immutable=True)
+    return response
@@ -1,5 +1,50 @@
-from django.test import TestCase
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
 from http import HTTPStatus
+from tempfile import mkdtemp
+from unittest import mock
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from .cache import SQLiteCache
+from .media import IMMUTABLE_MAX_AGE, serve_media
+from .profiling import install
+from .queries import QueryReport, check_query_budget
+
+User = get_user_model()
+BUDGET_ROWS = 15
+
+WORKERS = 4
+INCREMENTS = 200
+MEDIA_DIR = mkdtemp()
+HASHED = 'posts/ab/' + 'ab' * 32 + '.jpg'
+ODD_NAME = 'posts/фото 100%?.txt'
+STATIC_SOURCE = mkdtemp()
+STATIC_DIR = mkdtemp()
+STYLES = 'body { background: url("../img/dot.png"); }\n' * 40
+
+
+def hammer(location, worker):
+    cache = SQLiteCache(
+        location, {'OPTIONS': {'MAX_ENTRIES': WORKERS * INCREMENTS * 2}}
+    )
+    for step in range(INCREMENTS):
+        cache.incr('counter')
+        cache.set_many({f'{worker}:{step}': step, 'shared': worker})
+        assert cache.get_many([f'{worker}:{step}'])[f'{worker}:{step}'] == step
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +53,349 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        """set/add/get_many/incr/delete ведут себя как у кэшей Django"""
+        cache = self.make_cache()
+        cache.set('a', {'value': 1})
+        self.assertFalse(cache.add('a', 2))
+        self.assertTrue(cache.add('b', 2))
+        self.assertEqual(cache.get_many(['a', 'b', 'c']),
+                         {'a': {'value': 1}, 'b': 2})
+        self.assertEqual(cache.incr('b', 3), 5)
+        self.assertEqual(cache.decr('b'), 4)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set('expired', 1, -1)
+        self.assertIsNone(cache.get('expired'))
+        cache.delete('a')
+        self.assertFalse(cache.has_key('a'))
+
+    def test_lru_byte_budget(self):
+        """При превышении бюджета вытесняются давно не читанные записи"""
+        cache = self.make_cache(MAX_BYTES=4096)
+        cache.set('hot', 'x' * 512)
+        for number in range(20):
+            cache.get('hot')
+            cache.set(f'cold:{number}', 'x' * 512)
+        self.assertEqual(cache.get('hot'), 'x' * 512)
+        self.assertIsNone(cache.get('cold:0'))
+        total = cache._db.execute(
+            'SELECT total FROM cache_stats'
+        ).fetchone()[0]
+        stored = cache._db.execute(
+            'SELECT SUM(size) FROM cache'
+        ).fetchone()[0]
+        self.assertEqual(total, stored)
+        self.assertLessEqual(total, 4096)
+
+    def test_incr_keeps_byte_budget(self):
+        """incr обновляет размер записи и общий объём кэша"""
+        cache = self.make_cache()
+        cache.set('counter', 1)
+        cache.incr('counter', 2 ** 80)
+        total = cache._db.execute(
+            'SELECT total FROM cache_stats'
+        ).fetchone()[0]
+        stored = cache._db.execute(
+            'SELECT SUM(LENGTH(value)), SUM(size) FROM cache'
+        ).fetchone()
+        self.assertEqual(stored[0], stored[1])
+        self.assertEqual(total, stored[1])
+
+    def test_processes_share_cache(self):
+        """Несколько процессов атомарно инкрементируют общий счётчик"""
+        cache = self.make_cache(MAX_ENTRIES=WORKERS * INCREMENTS * 2)
+        cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=hammer, args=(self.location, worker))
+            for worker in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        self.assertEqual(cache.get('counter'), WORKERS * INCREMENTS)
+        self.assertIn(cache.get('shared'), range(WORKERS))
+        self.assertEqual(cache.get(f'0:{INCREMENTS - 1}'), INCREMENTS - 1)
+
+
+class QueryBudgetTest(TestCase):
+    """Горячие страницы укладываются в бюджеты QUERY_BUDGETS"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='budget_author')
+        cls.reader = User.objects.create_user(username='budget_reader')
+        cls.group = Group.objects.create(title='Группа', slug='budget')
+        cls.post = None
+        for number in range(BUDGET_ROWS):
+            cls.post = Post.objects.create(author=cls.author,
+                                           group=cls.group,
+                                           text=f'Пост {number}')
+            Comment.objects.create(author=cls.reader, post=cls.post,
+                                   text=f'Комментарий {number}')
+        for number in range(BUDGET_ROWS):
+            Comment.objects.create(author=cls.reader, post=cls.post,
+                                   text=f'Ещё комментарий {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_views_within_budget(self):
+        """Проверяется каждая страница с бюджетом"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:comments', args=(self.post.pk,)) + '?page=2',
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=Пост',
+            reverse('posts:autocomplete') + '?q=Пос',
+        )
+        checked = set()
+        for url in urls:
+            with self.subTest(url=url):
+                report = check_query_budget(self.client.get(url))
+                self.assertEqual(report.repeated, [])
+                checked.add(report.view_name)
+        self.assertEqual(checked, set(settings.QUERY_BUDGETS))
+
+    def test_recording_disabled(self):
+        """Без QUERY_RECORDING запросы не записываются"""
+        with override_settings(QUERY_RECORDING=False):
+            response = self.client.get(reverse('posts:index'))
+        self.assertFalse(hasattr(response, 'query_report'))
+
+    def test_repeated_queries_reported(self):
+        report = QueryReport('view', [
+            f'SELECT * FROM auth_user WHERE id = {number}'
+            for number in range(10)
+        ], budget=3)
+        self.assertTrue(report.over_budget)
+        self.assertEqual(report.repeated,
+                         [('SELECT * FROM auth_user WHERE id = ?', 10)])
+
+
+class TemplateProfileTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='profile_author')
+        for number in range(3):
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+
+    def setUp(self):
+        cache.clear()
+        install()
+
+    def test_profile_per_template_and_tag(self):
+        """Отчёт по шаблонам и тегам в ответе и Server-Timing"""
+        with mock.patch('core.middleware.TEMPLATE_PROFILING', True), \
+                self.assertLogs('core.templates', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        profile = response.template_profile
+        self.assertEqual(
+            profile.templates['posts/includes/post_form.html'][0], 3
+        )
+        self.assertEqual(profile.tags['post_card'][0], 3)
+        self.assertIn('posts/index.html', profile.templates)
+        self.assertAlmostEqual(
+            sum(seconds for _, seconds in profile.tags.values()),
+            profile.total, places=6,
+        )
+        self.assertTrue(response['Server-Timing'].startswith('tpl;'))
+        self.assertIn('posts:index', logs.output[0])
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(hasattr(response, 'template_profile'))
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_DIR)
+class MediaViewTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/plain.txt', HASHED, ODD_NAME):
+            path = os.path.join(MEDIA_DIR, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(b'0123456789')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, name, **headers):
+        return self.client.get(f'/media/{name}', **headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file(self):
+        """Файл целиком с ETag, Accept-Ranges и коротким кэшем"""
+        response = self.get('posts/plain.txt')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(self.body(response), b'0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        not_modified = self.get('posts/plain.txt',
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_hashed_name_is_immutable(self):
+        """Имя с хэшем содержимого кэшируется навсегда"""
+        response = self.get(HASHED)
+        self.assertEqual(response['Cache-Control'],
+                         f'public, max-age={IMMUTABLE_MAX_AGE}, immutable')
+
+    def test_ranges(self):
+        """Один отрезок Range, суффикс, If-Range и 416"""
+        response = self.get('posts/plain.txt', HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertEqual(self.body(response), b'2345')
+        # Сервер с sendfile начинает с текущей позиции дескриптора.
+        request = RequestFactory().get('/', HTTP_RANGE='bytes=2-5')
+        response = serve_media(request, 'posts/plain.txt')
+        self.assertEqual(
+            os.lseek(response.file_to_stream.fileno(), 0, os.SEEK_CUR), 2
+        )
+        response.close()
+        response = self.get('posts/plain.txt', HTTP_RANGE='bytes=-3')
+        self.assertEqual(self.body(response), b'789')
+        response = self.get('posts/plain.txt', HTTP_RANGE='bytes=2-5',
+                            HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.get('posts/plain.txt', HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code,
+                         HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_outside_media_root(self):
+        """Пути вне MEDIA_ROOT и служебные файлы не отдаются"""
+        for name in ('../settings.py', 'posts/.upload-x', 'posts/none'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code,
+                                 HTTPStatus.NOT_FOUND)
+
+    def test_front_server_handoff(self):
+        """С фронт-сервером Django отдаёт только заголовок"""
+        with mock.patch('core.media.MEDIA_SERVER', 'nginx'):
+            response = self.get(HASHED)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected-media/{HASHED}')
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+        with mock.patch('core.media.MEDIA_SERVER', 'apache'):
+            response = self.get('posts/plain.txt')
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(MEDIA_DIR, 'posts/plain.txt'))
+
+    def test_front_server_quoted_path(self):
+        """Пробелы, %, ? и кириллица в заголовке URL-кодированы"""
+        with mock.patch('core.media.MEDIA_SERVER', 'nginx'):
+            response = self.get(quote(ODD_NAME))
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/posts/%D1%84%D0%BE%D1%82%D0%BE%20100%25%3F.txt',
+        )
+        with mock.patch('core.media.MEDIA_SERVER', 'apache'):
+            response = self.get(quote(ODD_NAME))
+        self.assertEqual(unquote(response['X-Sendfile']),
+                         os.path.join(MEDIA_DIR, ODD_NAME))
+        self.assertNotIn(' ', response['X-Sendfile'])
+
+
+@override_settings(
+    STATICFILES_DIRS=(STATIC_SOURCE,), STATIC_ROOT=STATIC_DIR,
+    STATICFILES_STORAGE='core.staticfiles.'
+                        'CompressedManifestStaticFilesStorage',
+)
+class StaticFilesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name, data in (('css/site.css', STYLES.encode()),
+                           ('img/dot.png', b'\x89PNG' * 100)):
+            path = os.path.join(STATIC_SOURCE, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(data)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_SOURCE, ignore_errors=True)
+        shutil.rmtree(STATIC_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def stored(self, name):
+        return staticfiles_storage.stored_name(name)
+
+    def read(self, name):
+        with open(os.path.join(STATIC_DIR, name), 'rb') as file:
+            return file.read()
+
+    def test_collectstatic_output(self):
+        """Имена с хэшем, манифест и .gz только для текстовых файлов"""
+        css = self.stored('css/site.css')
+        png = self.stored('img/dot.png')
+        self.assertRegex(css, r'^css/site\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(STATIC_DIR, 'staticfiles.json')) as file:
+            manifest = json.load(file)
+        self.assertEqual(manifest['paths']['css/site.css'], css)
+        self.assertIn(png.split('/')[-1].encode(), self.read(css))
+        self.assertEqual(gzip.decompress(self.read(f'{css}.gz')),
+                         self.read(css))
+        self.assertFalse(os.path.exists(os.path.join(STATIC_DIR,
+                                                     f'{png}.gz')))
+
+    def test_gzip_negotiation(self):
+        """Сжатая копия только клиенту, который принимает gzip"""
+        css = self.stored('css/site.css')
+        url = f'/static/{css}'
+        cases = (('gzip, deflate, br', 'gzip'), ('br;q=1, gzip;q=0', None),
+                 ('', None), ('*', 'gzip'))
+        for header, encoding in cases:
+            with self.subTest(header=header):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING=header)
+                body = b''.join(response.streaming_content)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(response['Content-Type'], 'text/css')
+                expected = self.read(f'{css}.gz' if encoding else css)
+                self.assertEqual(body, expected)
+
+    def test_cache_headers(self):
+        """Имена из манифеста кэшируются навсегда, исходные — ненадолго"""
+        response = self.client.get(f'/static/{self.stored("img/dot.png")}')
+        self.assertEqual(
+            set(response['Cache-Control'].split(', ')),
+            {f'max-age={IMMUTABLE_MAX_AGE}', 'public', 'immutable'},
+        )
+        self.assertIn('Expires', response)
+        self.assertNotIn('Vary', response)
+        response = self.client.get('/static/img/dot.png')
+        self.assertNotIn('immutable', response['Cache-Control'])
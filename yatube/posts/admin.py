@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post, Comment, Follow
+from .search import filter_by_text
 
 PAGE_LMT = 10
 
@@ -19,6 +20,11 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_per_page = PAGE_LMT
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_by_text(queryset, 'posts_post_fts', search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
@@ -39,6 +45,12 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('created', 'author')
     list_per_page = PAGE_LMT
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return (filter_by_text(queryset, 'posts_comment_fts', search_term),
+                False)
+
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,232 @@
+from functools import wraps
+from operator import attrgetter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition
+
+from .etags import (group_etag, index_etag, post_etag, profile_etag,
+                    with_comments)
+from .links import fast_reverse
+from .models import Group, Post
+from .utils import FEED_ORDERING, POSTS_LMT, CursorPaginator, comments_of
+from .views import COMMENTS_ORDERING
+
+User = get_user_model()
+API_VERSION = 'v1'
+API_MAX_LIMIT = settings.API_MAX_LIMIT
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def author_object(user):
+    return {
+        'username': user.username,
+        'full_name': user.get_full_name(),
+        'url': fast_reverse('posts:api_profile', user.username),
+    }
+
+
+def group_object(group):
+    if group is None:
+        return None
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'url': fast_reverse('posts:api_group', group.slug),
+    }
+
+
+def image_object(post):
+    if not post.image:
+        return None
+    return {
+        'url': post.image.url,
+        'width': post.image_width,
+        'height': post.image_height,
+    }
+
+
+# Поле ответа: (колонки для only(), значение из объекта).
+POST_FIELDS = {
+    'id': (('id',), attrgetter('pk')),
+    'text': (('text',), attrgetter('text')),
+    'html': (('html',), attrgetter('html')),
+    'pub_date': (('pub_date',), lambda post: isoformat(post.pub_date)),
+    'updated': (('updated',), lambda post: isoformat(post.updated)),
+    'comments_count': (('comments_count',), attrgetter('comments_count')),
+    'image': (('image', 'image_width', 'image_height'), image_object),
+    'author': (('author__username', 'author__first_name',
+                'author__last_name'),
+               lambda post: author_object(post.author)),
+    'group': (('group__slug', 'group__title'),
+              lambda post: group_object(post.group)),
+    'url': (('id',), lambda post: fast_reverse('posts:api_post', post.pk)),
+}
+COMMENT_FIELDS = {
+    'id': (('id',), attrgetter('pk')),
+    'text': (('text',), attrgetter('text')),
+    'created': (('created',), lambda comment: isoformat(comment.created)),
+    'author': (('author__username', 'author__first_name',
+                'author__last_name'),
+               lambda comment: author_object(comment.author)),
+}
+
+
+def api_view(view):
+    """
+    Ошибки API отдаются в JSON: ApiError и Http404
+    превращаются в {"error": ...} с нужным статусом.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            message, status = str(error), error.status
+        except Http404:
+            message, status = 'Не найдено', 404
+        return JsonResponse({'error': message}, status=status,
+                            json_dumps_params={'ensure_ascii': False})
+    return wrapper
+
+
+def api_safe(view):
+    """
+    Как require_safe, но 405 отдаётся в JSON, как остальные ошибки API,
+    и до вычисления ETag.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        response = JsonResponse(
+            {'error': f'Метод {request.method} не поддерживается'},
+            status=405, json_dumps_params={'ensure_ascii': False},
+        )
+        response['Allow'] = ', '.join(SAFE_METHODS)
+        return response
+    return wrapper
+
+
+def selected_fields(request, resource):
+    """Поля из ?fields=a,b,c в порядке запроса; без параметра — все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return tuple(resource)
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in raw.split(',') if field.strip()
+    ))
+    unknown = [field for field in fields if field not in resource]
+    if unknown or not fields:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}'
+                       if unknown else 'Пустой список полей')
+    return fields
+
+
+def select(queryset, resource, fields, ordering):
+    """
+    Загружает только нужные колонки; связанные объекты — тем же
+    запросом, если они выбраны. Колонки ordering нужны курсору.
+    """
+    columns = {field.lstrip('-') for field in ordering}
+    for field in fields:
+        columns.update(resource[field][0])
+    related = {column.split('__')[0] for column in columns if '__' in column}
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def serialize(obj, resource, fields):
+    return {field: resource[field][1](obj) for field in fields}
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_LMT))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(limit, 1), API_MAX_LIMIT)
+
+
+def page_url(request, cursor):
+    if not cursor:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def listing(request, queryset, resource=POST_FIELDS,
+            ordering=FEED_ORDERING, **extra):
+    """Страница по курсору: {"results", "next", "previous"}."""
+    fields = selected_fields(request, resource)
+    paginator = CursorPaginator(select(queryset, resource, fields, ordering),
+                                page_limit(request), ordering)
+    page = paginator.cursor_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'version': API_VERSION,
+        **extra,
+        'results': [serialize(obj, resource, fields) for obj in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@api_safe
+@condition(etag_func=with_comments(index_etag))
+@api_view
+def feed(request):
+    return listing(request, Post.objects.all())
+
+
+@api_safe
+@condition(etag_func=with_comments(group_etag))
+@api_view
+def group_feed(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return listing(request, group.posts.all(), group=group_object(group))
+
+
+@api_safe
+@condition(etag_func=with_comments(profile_etag))
+@api_view
+def profile_feed(request, username):
+    author = get_object_or_404(User, username=username)
+    return listing(request, author.posts.all(), author=author_object(author))
+
+
+@api_safe
+@condition(etag_func=post_etag)
+@api_view
+def post_detail(request, post_id):
+    fields = selected_fields(request, POST_FIELDS)
+    post = get_object_or_404(
+        select(Post.objects.all(), POST_FIELDS, fields, ()), pk=post_id
+    )
+    return JsonResponse({
+        'version': API_VERSION,
+        **serialize(post, POST_FIELDS, fields),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@api_safe
+@condition(etag_func=post_etag)
+@api_view
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return listing(request, comments_of(post_id), COMMENT_FIELDS,
+                   COMMENTS_ORDERING)
@@ -0,0 +1,78 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from . import variants
+from .models import ImageBlob, Post
+
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+
+def delete_files(name):
+    """Удаляет файл вместе с его миниатюрами sorl и вариантами."""
+    try:
+        IMAGE_STORAGE.path(name)
+    except SuspiciousFileOperation:
+        # Имя вне MEDIA_ROOT: файл не наш, не трогаем.
+        return
+    default.kvstore.delete(ImageFile(name, IMAGE_STORAGE))
+    for width in variants.IMAGE_VARIANT_WIDTHS:
+        for image_format in variants.formats_of(name):
+            IMAGE_STORAGE.delete(variants.variant_name(name, width,
+                                                       image_format))
+    IMAGE_STORAGE.delete(name)
+
+
+def retain(name):
+    """Добавляет ссылку на файл, сохранённый в обход хранилища."""
+    blobs = ImageBlob.objects.filter(name=name)
+    try:
+        with transaction.atomic():
+            if not blobs.update(refs=F('refs') + 1):
+                ImageBlob.objects.create(name=name, refs=1)
+    except IntegrityError:
+        # Параллельная загрузка того же содержимого успела создать запись.
+        blobs.update(refs=F('refs') + 1)
+
+
+def release(name):
+    """
+    Снимает одну ссылку поста на файл; последняя ссылка удаляет файл.
+    Счётчик и удаление — в одной транзакции с записью в хранилище,
+    поэтому параллельная загрузка того же содержимого не теряет файл.
+    """
+    if not name:
+        return
+    with transaction.atomic():
+        ImageBlob.objects.filter(name=name).update(refs=F('refs') - 1)
+        if ImageBlob.objects.filter(name=name, refs__lte=0).delete()[0]:
+            delete_files(name)
+
+
+def reconcile():
+    """
+    Пересчитывает ссылки по постам и удаляет файлы, на которые
+    никто не ссылается. Возвращает число удалённых файлов.
+    """
+    refs = dict(Post.objects.exclude(image='').order_by().values(
+        'image'
+    ).annotate(refs=Count('pk')).values_list('image', 'refs'))
+    removed = 0
+    with transaction.atomic():
+        for blob in ImageBlob.objects.select_for_update():
+            if blob.name not in refs:
+                blob.delete()
+                delete_files(blob.name)
+                removed += 1
+            elif blob.refs != refs[blob.name]:
+                ImageBlob.objects.filter(pk=blob.pk).update(
+                    refs=refs[blob.name]
+                )
+        known = set(ImageBlob.objects.values_list('name', flat=True))
+        ImageBlob.objects.bulk_create(
+            ImageBlob(name=name, refs=count)
+            for name, count in refs.items() if name not in known
+        )
+    return removed
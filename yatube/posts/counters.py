@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+RECONCILE_BATCH = 500
+
+
+def shifted(field, delta):
+    """
+    F(field) + delta; уменьшение не опускается ниже нуля. Счётчик мог
+    разойтись с данными (bulk_create, удаление мимо сигналов), и тогда
+    CHECK (>= 0) положительного поля уронил бы запрос.
+    """
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0)
+
+
+def bump_author(user_id, **deltas):
+    """
+    Атомарно меняет счётчики пользователя на переданные приращения.
+    Строка создаётся только при увеличении: уменьшение может прийти
+    из каскадного удаления самого пользователя.
+    """
+    changes = {field: shifted(field, delta) for field, delta in deltas.items()}
+    if AuthorStats.objects.filter(user_id=user_id).update(**changes):
+        return
+    if min(deltas.values()) < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(user_id=user_id)
+    except IntegrityError:
+        pass
+    AuthorStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=shifted('comments_count', delta)
+    )
+
+
+def count_of(queryset, field):
+    """Подзапрос с количеством строк queryset, сгруппированных по field."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile_authors(batch_size=RECONCILE_BATCH):
+    """Пересчитывает счётчики пользователей пачками, возвращает число
+    правок."""
+    fixed = 0
+    last_pk = 0
+    while True:
+        users = list(User.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).annotate(
+            real_posts=count_of(Post.objects.all(), 'author'),
+            real_followers=count_of(Follow.objects.all(), 'author'),
+            real_following=count_of(Follow.objects.all(), 'user'),
+        ).values_list('pk', 'real_posts', 'real_followers',
+                      'real_following')[:batch_size])
+        if not users:
+            return fixed
+        last_pk = users[-1][0]
+        stored = {
+            stats.user_id: stats
+            for stats in AuthorStats.objects.filter(
+                user_id__in=[row[0] for row in users]
+            )
+        }
+        with transaction.atomic():
+            for pk, posts, followers, following in users:
+                stats = stored.get(pk) or AuthorStats(user_id=pk)
+                real = (posts, followers, following)
+                if stats.pk and real == (stats.posts_count,
+                                         stats.followers_count,
+                                         stats.following_count):
+                    continue
+                (stats.posts_count, stats.followers_count,
+                 stats.following_count) = real
+                stats.save()
+                fixed += 1
+
+
+def reconcile_posts(batch_size=RECONCILE_BATCH):
+    """Пересчитывает comments_count постов пачками, возвращает число правок."""
+    fixed = 0
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).annotate(
+            real_comments=count_of(Comment.objects.all(), 'post'),
+        ).values_list('pk', 'comments_count', 'real_comments')[:batch_size])
+        if not posts:
+            return fixed
+        last_pk = posts[-1][0]
+        with transaction.atomic():
+            for pk, stored, real in posts:
+                if stored != real:
+                    Post.objects.filter(pk=pk).update(comments_count=real)
+                    fixed += 1
@@ -0,0 +1,83 @@
+import hashlib
+from functools import wraps
+
+from .generations import (COMMENTS_SCOPE, GLOBAL_SCOPE, author_scope,
+                          get_generation, group_scope, post_scope)
+from .models import AuthorStats, Follow, Group, Post
+
+
+def make_etag(request, *parts):
+    """
+    ETag страницы из версий её данных. Адрес с параметрами и зритель
+    входят в ключ: шапка, формы и кнопки подписки зависят от пользователя.
+    """
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = ':'.join(str(part) for part in (
+        request.get_full_path(), viewer, *parts
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def index_etag(request):
+    return make_etag(request, get_generation(GLOBAL_SCOPE))
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return make_etag(request, get_generation(group_scope(group_id)))
+
+
+def profile_etag(request, username):
+    stats = AuthorStats.objects.filter(user__username=username).values_list(
+        'user_id', 'posts_count', 'followers_count', 'following_count'
+    ).first()
+    if stats is None:
+        return None
+    following = (request.user.is_authenticated
+                 and Follow.objects.filter(user=request.user,
+                                           author_id=stats[0]).exists())
+    return make_etag(request, *stats, following,
+                     get_generation(author_scope(stats[0])))
+
+
+def post_etag(request, post_id):
+    """
+    Кроме версии поста, страница зависит от имени автора и названия
+    группы: их смена меняет версии author_scope и group_scope.
+    В странице форма комментария с токеном CSRF: после входа
+    токен меняется, и закэшированная страница с прежним не годится.
+    """
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id', 'author__stats__posts_count'
+    ).first()
+    if row is None:
+        return None
+    author_id, group_id, posts_count = row
+    scopes = [post_scope(post_id), author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return make_etag(request, posts_count, request.META.get('CSRF_COOKIE'),
+                     *(get_generation(scope) for scope in scopes))
+
+
+def comments_etag(request, post_id):
+    """Карточки автора во фрагменте нет: хватает версии поста."""
+    return make_etag(request, get_generation(post_scope(post_id)))
+
+
+def with_comments(etag_func):
+    """
+    ETag ленты API: в постах есть comments_count, а новый комментарий
+    меняет только версию своего поста, но не версии лент.
+    """
+    @wraps(etag_func)
+    def etag(request, *args, **kwargs):
+        base = etag_func(request, *args, **kwargs)
+        if base is None:
+            return None
+        return make_etag(request, base, get_generation(COMMENTS_SCOPE))
+    return etag
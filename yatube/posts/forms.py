@@ -1,5 +1,8 @@
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
 from django.forms import ModelForm
 
+from .ingest import ImageRejected, ingest
 from .models import Post, Comment
 
 
@@ -13,6 +16,26 @@ class PostForm(ModelForm):
             'image': 'Изображение'
         }
 
+    def clean_image(self):
+        """
+        Новая картинка проходит ingest: размеры записываются в пост,
+        в хранилище уходит уменьшенная копия без EXIF.
+        """
+        image = self.cleaned_data.get('image')
+        if not image:
+            self.instance.image_width = self.instance.image_height = None
+            return image
+        if not isinstance(image, UploadedFile):
+            return image
+        image.seek(0)
+        try:
+            data, width, height = ingest(image.read())
+        except ImageRejected as error:
+            raise ValidationError(f'Картинка отклонена: {error}')
+        self.instance.image_width = width
+        self.instance.image_height = height
+        return SimpleUploadedFile(image.name, data, image.content_type)
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,49 @@
+from time import time_ns
+
+from django.core.cache import cache
+
+GLOBAL_SCOPE = 'global'
+# Любой комментарий: счётчики комментариев в лентах API.
+COMMENTS_SCOPE = 'comments'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def generation_key(scope):
+    return f'feed_generation:{scope}'
+
+
+def get_generation(scope):
+    """
+    Текущее поколение ленты; входит в ключ её кэшированных фрагментов.
+    Начальное значение берётся из часов, чтобы после вытеснения счётчика
+    из кэша не совпасть с поколением уже закэшированных фрагментов.
+    """
+    return cache.get_or_set(generation_key(scope), time_ns, None)
+
+
+def bump_generations(*scopes):
+    """Делает устаревшими все кэшированные фрагменты переданных лент."""
+    for scope in set(scopes):
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time_ns(), None)
+
+
+def post_scopes(group_id, author_id):
+    scopes = [GLOBAL_SCOPE, author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
@@ -0,0 +1,351 @@
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import suggestions, timeline
+from .counters import count_of, reconcile_authors
+from .generations import (COMMENTS_SCOPE, GLOBAL_SCOPE, author_scope,
+                          bump_generations, group_scope)
+from .markup import render_text
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .utils import invalidate_counts
+
+User = get_user_model()
+IMPORT_BATCH = 1000
+IMPORT_CHUNK = 50000
+# Порядок важен: записи ссылаются на уже загруженные.
+KINDS = ('users', 'groups', 'posts', 'comments', 'follows')
+# Пользователи и группы сопоставляются по естественному ключу:
+# уже существующие не создаются заново.
+NATURAL_KEYS = {'users': (User, 'username'), 'groups': (Group, 'slug')}
+# Посты и комментарии получают pk = base + номер строки файла,
+# поэтому повтор после сбоя не создаёт дублей.
+NUMBERED = {'posts': Post, 'comments': Comment}
+
+
+class ImportFailed(ValueError):
+    pass
+
+
+def parse_date(value, default):
+    if not value:
+        return default
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+@contextmanager
+def keep_timestamps(*models):
+    """
+    bulk_create вызывает pre_save полей, и auto_now/auto_now_add
+    затёрли бы даты из файла. На время загрузки они отключаются.
+    """
+    fields = [field for model in models for field in model._meta.fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Importer:
+    """
+    Загружает JSONL-файлы users, groups, posts, comments и follows
+    из каталога пачками bulk_create, по chunk_size строк в транзакции.
+    id из файлов сопоставляются с новыми pk через словари в памяти.
+    После каждой транзакции номер строки сохраняется в checkpoint,
+    и повторный запуск продолжает с него, заново собрав словари
+    по уже загруженным строкам.
+    Сигналы при bulk_create не срабатывают, поэтому счётчики, ленты
+    подписок, подсказки и кэши обновляются в finish().
+    Запускать при закрытом на запись сайте: диапазоны pk постов
+    и комментариев занимаются заранее.
+    """
+
+    def __init__(self, directory, checkpoint=None, batch_size=IMPORT_BATCH,
+                 chunk_size=IMPORT_CHUNK, progress=None):
+        self.directory = directory
+        self.checkpoint = checkpoint or os.path.join(
+            directory, 'import_yatube.checkpoint.json'
+        )
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.progress = progress or (lambda message: None)
+        self.ids = {'users': {}, 'groups': {}, 'posts': {}}
+        self.followers = set()
+        self.skipped = dict.fromkeys(KINDS, 0)
+        self.state = self.load_state()
+
+    def load_state(self):
+        if not os.path.exists(self.checkpoint):
+            return {'done': {}, 'bases': {}}
+        with open(self.checkpoint, encoding='utf-8') as file:
+            return json.load(file)
+
+    def save_state(self):
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+        os.replace(temporary, self.checkpoint)
+
+    def run(self):
+        """Загружает все файлы и возвращает {вид: загружено строк}."""
+        loaded = {}
+        with keep_timestamps(Post, Comment):
+            for kind in KINDS:
+                path = os.path.join(self.directory, f'{kind}.jsonl')
+                if os.path.exists(path):
+                    loaded[kind] = self.load(kind, path)
+        self.finish()
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return loaded
+
+    def records(self, path):
+        with open(path, encoding='utf-8') as file:
+            for number, line in enumerate(file):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except ValueError as error:
+                    raise ImportFailed(f'{path}:{number + 1}: {error}')
+
+    def base(self, kind):
+        """Первый pk диапазона вида; выбирается один раз за импорт."""
+        bases = self.state['bases']
+        if kind not in bases:
+            last = NUMBERED[kind].objects.aggregate(last=Max('pk'))['last']
+            bases[kind] = (last or 0) + 1
+        return bases[kind]
+
+    def chunks(self, path):
+        records = self.records(path)
+        return iter(lambda: list(islice(records, self.chunk_size)), [])
+
+    def load(self, kind, path):
+        done = self.state['done'].get(kind, 0)
+        started, loaded = perf_counter(), 0
+        for chunk in self.chunks(path):
+            replayed = [item for item in chunk if item[0] < done]
+            if replayed:
+                self.replay(kind, replayed)
+            chunk = [item for item in chunk if item[0] >= done]
+            if not chunk:
+                continue
+            try:
+                with transaction.atomic():
+                    self.insert(kind, chunk)
+            except (KeyError, TypeError, ValueError) as error:
+                raise ImportFailed(f'{path}: {error!r}')
+            loaded += len(chunk)
+            self.state['done'][kind] = chunk[-1][0] + 1
+            self.save_state()
+            rate = loaded / (perf_counter() - started)
+            self.progress(f'{kind}: {done + loaded} строк, {rate:.0f}/с')
+        return loaded
+
+    def replay(self, kind, chunk):
+        """Восстанавливает словари id по строкам, загруженным до сбоя."""
+        if kind in NATURAL_KEYS:
+            self.map_natural(kind, [record for _, record in chunk])
+        elif kind == 'posts':
+            for number, record in chunk:
+                if self.post_refs(record) is not None:
+                    self.ids['posts'][record['id']] = (
+                        self.base('posts') + number
+                    )
+        elif kind == 'follows':
+            for _, record in chunk:
+                refs = self.follow_refs(record)
+                if refs is not None:
+                    self.followers.add(refs[0])
+
+    def batches(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def natural_pks(self, kind, records):
+        """{ключ: pk} существующих записей; запросы по batch_size ключей."""
+        model, key = NATURAL_KEYS[kind]
+        found = {}
+        for batch in self.batches([record[key] for record in records]):
+            found.update(model.objects.filter(
+                **{f'{key}__in': batch}
+            ).values_list(key, 'pk'))
+        return found
+
+    def map_natural(self, kind, records):
+        key = NATURAL_KEYS[kind][1]
+        found = self.natural_pks(kind, records)
+        for record in records:
+            if record[key] in found:
+                self.ids[kind][record['id']] = found[record[key]]
+
+    def bulk_create(self, model, objects, **options):
+        """
+        bulk_create пачками не больше, чем принимает база: Django 2.2
+        не урезает batch_size сам, и SQLite упирается в число
+        параметров и слагаемых UNION ALL.
+        """
+        objects = list(objects)
+        limit = connection.ops.bulk_batch_size(model._meta.concrete_fields,
+                                               objects)
+        model.objects.bulk_create(
+            objects, batch_size=max(min(self.batch_size, limit), 1),
+            **options
+        )
+
+    def insert(self, kind, chunk):
+        records = [record for _, record in chunk]
+        if kind in NATURAL_KEYS:
+            self.insert_natural(kind, records)
+            return
+        objects = []
+        for number, record in chunk:
+            obj = getattr(self, f'build_{kind[:-1]}')(number, record)
+            if obj is None:
+                self.skipped[kind] += 1
+            else:
+                objects.append(obj)
+        model = NUMBERED.get(kind, Follow)
+        self.bulk_create(model, objects, ignore_conflicts=True)
+
+    def insert_natural(self, kind, records):
+        model, key = NATURAL_KEYS[kind]
+        existing = self.natural_pks(kind, records)
+        build = getattr(self, f'build_{kind[:-1]}')
+        objects = {}
+        for record in records:
+            if record[key] not in existing:
+                objects.setdefault(record[key], build(record))
+        self.bulk_create(model, objects.values())
+        self.map_natural(kind, records)
+        if kind == 'users':
+            self.bulk_create(
+                AuthorStats,
+                (AuthorStats(user_id=self.ids['users'][record['id']])
+                 for record in records),
+                ignore_conflicts=True,
+            )
+
+    def build_user(self, record):
+        return User(
+            username=record['username'],
+            first_name=record.get('first_name', ''),
+            last_name=record.get('last_name', ''),
+            email=record.get('email', ''),
+            password=record.get('password') or make_password(None),
+            date_joined=parse_date(record.get('date_joined'),
+                                   timezone.now()),
+        )
+
+    def build_group(self, record):
+        return Group(title=record['title'], slug=record['slug'],
+                     description=record.get('description'))
+
+    def post_refs(self, record):
+        """(author_id, group_id) поста или None, если ссылок нет."""
+        author_id = self.ids['users'].get(record['author'])
+        group = record.get('group')
+        group_id = self.ids['groups'].get(group) if group else None
+        if author_id is None or group and group_id is None:
+            return None
+        return author_id, group_id
+
+    def follow_refs(self, record):
+        user_id = self.ids['users'].get(record['user'])
+        author_id = self.ids['users'].get(record['author'])
+        if user_id is None or author_id is None or user_id == author_id:
+            return None
+        return user_id, author_id
+
+    def build_post(self, number, record):
+        refs = self.post_refs(record)
+        if refs is None:
+            return None
+        author_id, group_id = refs
+        pk = self.base('posts') + number
+        self.ids['posts'][record['id']] = pk
+        pub_date = parse_date(record.get('pub_date'), timezone.now())
+        # save() здесь не вызывается: HTML готовим сами.
+        return Post(
+            pk=pk, author_id=author_id, group_id=group_id,
+            text=record['text'], html=render_text(record['text']),
+            pub_date=pub_date,
+            updated=parse_date(record.get('updated'), pub_date),
+        )
+
+    def build_comment(self, number, record):
+        post_id = self.ids['posts'].get(record['post'])
+        author_id = self.ids['users'].get(record['author'])
+        if post_id is None or author_id is None:
+            return None
+        return Comment(
+            pk=self.base('comments') + number, post_id=post_id,
+            author_id=author_id, text=record['text'],
+            created=parse_date(record.get('created'), timezone.now()),
+        )
+
+    def build_follow(self, number, record):
+        refs = self.follow_refs(record)
+        if refs is None:
+            return None
+        user_id, author_id = refs
+        self.followers.add(user_id)
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def imported(self, kind):
+        """Посты или комментарии, загруженные этим импортом."""
+        model = NUMBERED[kind]
+        if kind not in self.state['bases']:
+            return model.objects.none()
+        return model.objects.filter(pk__gte=self.state['bases'][kind])
+
+    def finish(self):
+        """То, что при обычном save() делают сигналы, — разом для всех."""
+        self.progress('Пересчёт счётчиков, лент и подсказок')
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [Post, Comment]
+            ):
+                cursor.execute(sql)
+        posts = self.imported('posts')
+        posts.update(comments_count=count_of(Comment.objects.all(), 'post'))
+        reconcile_authors(self.batch_size)
+        # Новые посты — всем подписчикам, прежние посты — по новым подпискам.
+        base = self.state['bases'].get('posts')
+        if base is not None:
+            timeline.fill(Follow.objects.all(), pk__gte=base)
+        older = {} if base is None else {'pk__lt': base}
+        for batch in self.batches(sorted(self.followers)):
+            timeline.fill(Follow.objects.filter(user_id__in=batch), **older)
+        suggestions.rebuild()
+        scopes = posts.order_by().values_list('author_id', 'group_id')
+        authors, groups = set(), set()
+        for author_id, group_id in scopes.distinct():
+            authors.add(author_scope(author_id))
+            if group_id is not None:
+                groups.add(group_scope(group_id))
+        bump_generations(GLOBAL_SCOPE, COMMENTS_SCOPE, *authors, *groups)
+        invalidate_counts(Post)
+        invalidate_counts(Comment)
@@ -0,0 +1,99 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+IMAGE_MAX_SIDE = settings.IMAGE_MAX_SIDE
+IMAGE_MAX_PIXELS = settings.IMAGE_MAX_PIXELS
+IMAGE_MAX_BYTES = settings.IMAGE_MAX_BYTES
+IMAGE_INGEST_WORKERS = settings.IMAGE_INGEST_WORKERS
+IMAGE_QUALITY = 85
+
+_executor = None
+_lock = threading.Lock()
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+def process(data, max_side=IMAGE_MAX_SIDE, max_pixels=IMAGE_MAX_PIXELS):
+    """
+    Нормализует загруженную картинку: отклоняет слишком большие по числу
+    пикселей до декодирования, поворачивает по EXIF и убирает метаданные,
+    уменьшает до max_side по большей стороне. Возвращает
+    (байты, ширина, высота); если менять нечего, байты — исходные.
+    Выполняется в отдельном процессе, поэтому работает только с байтами.
+    Битый или обрезанный файл Pillow замечает только при декодировании,
+    поэтому его ошибки тоже становятся ImageRejected.
+    """
+    try:
+        return normalize(data, max_side, max_pixels)
+    except ImageRejected:
+        raise
+    except (Image.DecompressionBombError, OSError, SyntaxError,
+            ValueError) as error:
+        raise ImageRejected(str(error))
+
+
+def normalize(data, max_side, max_pixels):
+    image = Image.open(BytesIO(data))
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejected(f'{width}x{height} — слишком много пикселей')
+    image_format = image.format
+    animated = getattr(image, 'is_animated', False)
+    oversized = max(width, height) > max_side
+    if animated:
+        if oversized:
+            raise ImageRejected('Анимация больше допустимого размера')
+        return data, width, height
+    has_metadata = bool(image.getexif()) or 'exif' in image.info
+    if not oversized and not has_metadata:
+        return data, width, height
+    if image_format == 'JPEG':
+        # Декодирование сразу в уменьшенном масштабе.
+        image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return encode(image, image_format), image.width, image.height
+
+
+def encode(image, image_format):
+    """Пересохраняет картинку в исходном формате, без EXIF."""
+    options = {}
+    if image_format == 'JPEG':
+        options.update(quality=IMAGE_QUALITY, optimize=True)
+        if image.mode not in ('RGB', 'L', 'CMYK'):
+            image = image.convert('RGB')
+    elif image_format == 'PNG':
+        options['optimize'] = True
+    elif image_format == 'WEBP':
+        options['quality'] = IMAGE_QUALITY
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn: в процессе уже работают потоки, fork с ними небезопасен.
+            _executor = ProcessPoolExecutor(
+                IMAGE_INGEST_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _executor
+
+
+def ingest(data):
+    """process() в пуле процессов; при IMAGE_INGEST_WORKERS = 0 — здесь."""
+    if len(data) > IMAGE_MAX_BYTES:
+        raise ImageRejected('Файл слишком большой')
+    if not IMAGE_INGEST_WORKERS:
+        return process(data)
+    return _pool().submit(process, data).result()
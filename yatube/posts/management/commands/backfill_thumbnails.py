@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import THUMBNAIL_WORKERS, generate
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для картинок всех постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=THUMBNAIL_WORKERS)
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='').order_by().values_list(
+                'image', flat=True
+            ).distinct()
+        )
+        failed = 0
+        with ThreadPoolExecutor(options['workers']) as executor:
+            futures = {executor.submit(generate, name): name
+                       for name in names}
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(
+                        f'{futures[future]}: {future.exception()}'
+                    )
+        self.stdout.write(
+            f'Обработано картинок: {len(names) - failed}, ошибок: {failed}'
+        )
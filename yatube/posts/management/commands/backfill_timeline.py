@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Досоздаёт записи материализованной ленты по подпискам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id подписчика; можно указать несколько раз',
+        )
+
+    def handle(self, *args, **options):
+        processed = timeline.backfill(options['user_ids'])
+        self.stdout.write(f'Обработано подписок: {processed}')
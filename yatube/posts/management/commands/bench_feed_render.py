@@ -0,0 +1,105 @@
+import os
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine
+from django.template.backends.django import get_installed_libraries
+from django.utils import timezone
+
+from core.profiling import TemplateProfile, install
+from posts.models import Group, Post
+from posts.templatetags.cards import CARD_TEMPLATE
+
+User = get_user_model()
+POSTS_LMT = settings.POSTS_ON_PAGE_LMT
+INCLUDE_LOOP = ('{% for post in page_obj %}'
+                '{% include "posts/includes/post_form.html" %}{% endfor %}')
+CARD_LOOP = ('{% load cards %}{% for post in page_obj %}'
+             '{% post_card post %}{% endfor %}')
+# Карточка до предвычисленных ссылок: по три {% url %} на пост.
+LEGACY_URLS = {
+    '{{ post.links.profile }}': "{% url 'posts:profile' post.author %}",
+    '{{ post.links.detail }}': "{% url 'posts:post_detail' post.pk %}",
+    '{{ post.links.group }}':
+        "{% url 'posts:group_list' post.group.slug %}",
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время отрисовки страницы ленты: include '
+            'с {% url %} без кэша шаблонов и {% post_card %} '
+            'с предвычисленными ссылками с кэшем и без')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--profile', action='store_true',
+                            help='Показать самые долгие шаблоны и теги')
+
+    def page(self):
+        author = User(pk=1, username='bench_author', first_name='Автор',
+                      last_name='Ленты')
+        group = Group(pk=1, title='Группа', slug='bench')
+        return [
+            Post(pk=number, author=author,
+                 group=group if number % 2 else None,
+                 pub_date=timezone.now(),
+                 text=f'Пост {number}\n\nВторой абзац текста поста.')
+            for number in range(1, POSTS_LMT + 1)
+        ]
+
+    def legacy_card(self):
+        with open(os.path.join(settings.TEMPLATES_DIR, CARD_TEMPLATE),
+                  encoding='utf-8') as file:
+            source = file.read()
+        for link, url in LEGACY_URLS.items():
+            source = source.replace(link, url)
+        return source
+
+    def engine(self, loaders):
+        return Engine(dirs=[settings.TEMPLATES_DIR], loaders=loaders,
+                      libraries=get_installed_libraries())
+
+    def variants(self):
+        legacy = [('django.template.loaders.locmem.Loader', {
+            'feed.html': INCLUDE_LOOP, CARD_TEMPLATE: self.legacy_card(),
+        })]
+        loaders = [('django.template.loaders.locmem.Loader',
+                    {'feed.html': CARD_LOOP}),
+                   'django.template.loaders.filesystem.Loader']
+        return (
+            ('include и {% url %}, без кэша шаблонов', self.engine(legacy)),
+            ('{% post_card %}, без кэша шаблонов', self.engine(loaders)),
+            ('{% post_card %}, кэш шаблонов', self.engine([
+                ('django.template.loaders.cached.Loader', loaders),
+            ])),
+        )
+
+    def render(self, engine, posts):
+        # Ссылки считаются заново, как для постов из нового запроса.
+        for post in posts:
+            post.__dict__.pop('links', None)
+        return engine.get_template('feed.html').render(
+            Context({'page_obj': posts})
+        )
+
+    def handle(self, *args, **options):
+        posts, repeat = self.page(), options['repeat']
+        if options['profile']:
+            install()
+        outputs = set()
+        for label, engine in self.variants():
+            outputs.add(self.render(engine, posts))
+            started = perf_counter()
+            for _ in range(repeat):
+                self.render(engine, posts)
+            elapsed = (perf_counter() - started) / repeat * 1000
+            self.stdout.write(f'{label}: {elapsed:.3f} мс/страница '
+                              f'из {POSTS_LMT} постов')
+            if options['profile']:
+                with TemplateProfile().active() as profile:
+                    self.render(engine, posts)
+                self.stdout.write(profile.describe(label))
+        if len(outputs) != 1:
+            self.stderr.write('Варианты отрисовали разный HTML')
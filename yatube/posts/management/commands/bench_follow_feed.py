@@ -0,0 +1,57 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post
+from posts.timeline import HybridFeedPaginator
+
+User = get_user_model()
+POSTS_LMT = settings.POSTS_ON_PAGE_LMT
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает чтение ленты подписок через JOIN с Follow '
+            'и через гибридную материализованную ленту')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def measure(self, read, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            read()
+        return (perf_counter() - started) / repeat * 1000
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Пользователь не найден')
+        repeat = options['repeat']
+
+        def join():
+            return list(
+                Post.objects.select_related('author', 'group').filter(
+                    author__following__user=user
+                ).order_by('-pub_date', '-id')[:POSTS_LMT]
+            )
+
+        feed = HybridFeedPaginator(user, Post.objects.all(), POSTS_LMT)
+
+        def materialized():
+            return feed.fetch(None, False, POSTS_LMT)
+
+        if join() != materialized():
+            self.stderr.write(
+                'Ленты расходятся, запустите repair_timeline'
+            )
+        self.stdout.write(
+            f'JOIN с Follow: {self.measure(join, repeat):.3f} мс/страница'
+        )
+        self.stdout.write(
+            f'Гибридная лента: '
+            f'{self.measure(materialized, repeat):.3f} мс/страница'
+        )
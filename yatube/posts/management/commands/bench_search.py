@@ -0,0 +1,74 @@
+import os
+import random
+import sqlite3
+import tempfile
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from posts.search import index_statements, match_expression
+
+WORDS = ('лето', 'море', 'город', 'кот', 'дорога', 'книга', 'утро', 'дождь',
+         'поезд', 'сад', 'река', 'песня', 'окно', 'друг', 'ветер', 'снег')
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск через FTS5 MATCH и LIKE на синтетической '
+            'таблице во временной базе SQLite')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--query', default='поезд река')
+
+    def measure(self, db, sql, params, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            found = db.execute(sql, params).fetchall()
+        return (perf_counter() - started) / repeat * 1000, len(found)
+
+    def fill(self, db, rows):
+        db.execute('CREATE TABLE posts_post '
+                   '(id INTEGER PRIMARY KEY, text TEXT NOT NULL)')
+        for statement in index_statements('posts_post_fts', 'posts_post'):
+            db.execute(statement)
+        generator = random.Random(0)
+        batch = 10000
+        for start in range(0, rows, batch):
+            db.executemany(
+                'INSERT INTO posts_post (text) VALUES (?)',
+                ((' '.join(generator.choices(WORDS, k=12)),)
+                 for _ in range(min(batch, rows - start))),
+            )
+        db.commit()
+
+    def handle(self, *args, **options):
+        query, repeat = options['query'], options['repeat']
+        with tempfile.TemporaryDirectory() as directory:
+            db = sqlite3.connect(os.path.join(directory, 'bench.sqlite3'))
+            started = perf_counter()
+            self.fill(db, options['rows'])
+            self.stdout.write(
+                f'Заполнение {options["rows"]} строк: '
+                f'{perf_counter() - started:.1f} с'
+            )
+            like = ' AND '.join(['text LIKE ?'] * len(query.split()))
+            like_ms, like_found = self.measure(
+                db, f'SELECT id FROM posts_post WHERE {like}',
+                [f'%{word}%' for word in query.split()], repeat,
+            )
+            fts_ms, fts_found = self.measure(
+                db, 'SELECT rowid FROM posts_post_fts '
+                    'WHERE posts_post_fts MATCH ?',
+                (match_expression(query),), repeat,
+            )
+            ranked_ms, _ = self.measure(
+                db, 'SELECT rowid FROM posts_post_fts '
+                    'WHERE posts_post_fts MATCH ? '
+                    'ORDER BY bm25(posts_post_fts) LIMIT 10',
+                (match_expression(query),), repeat,
+            )
+            db.close()
+        self.stdout.write(f'LIKE: {like_ms:.1f} мс, найдено {like_found}')
+        self.stdout.write(f'FTS5 MATCH: {fts_ms:.1f} мс, найдено {fts_found}')
+        self.stdout.write(f'FTS5 MATCH, первые 10 по bm25: {ranked_ms:.1f} мс')
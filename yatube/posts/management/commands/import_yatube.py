@@ -0,0 +1,45 @@
+import os
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import (IMPORT_BATCH, IMPORT_CHUNK, KINDS, Importer,
+                            ImportFailed)
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, посты, комментарии '
+            'и подписки из JSONL-файлов каталога: '
+            + ', '.join(f'{kind}.jsonl' for kind in KINDS))
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH,
+                            help='Строк в одном bulk_create')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK,
+                            help='Строк в одной транзакции')
+        parser.add_argument('--checkpoint',
+                            help='Файл с позицией для продолжения импорта')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['directory']):
+            raise CommandError(f'Нет каталога {options["directory"]}')
+        importer = Importer(
+            options['directory'], checkpoint=options['checkpoint'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'], progress=self.stdout.write,
+        )
+        started = perf_counter()
+        try:
+            loaded = importer.run()
+        except ImportFailed as error:
+            raise CommandError(f'{error}. Повторный запуск продолжит '
+                               f'с последней сохранённой позиции')
+        elapsed = perf_counter() - started
+        for kind, count in loaded.items():
+            skipped = importer.skipped[kind]
+            self.stdout.write(
+                f'{kind}: строк {count}'
+                + (f', пропущено без связей {skipped}' if skipped else '')
+            )
+        self.stdout.write(f'Готово за {elapsed:.1f} с')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.search import rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('Полнотекстовый индекс есть только для SQLite')
+        rebuild_index()
+        self.stdout.write('Индекс перестроен')
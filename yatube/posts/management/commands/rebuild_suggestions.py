@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересоздаёт подсказки автодополнения для пользователей и групп'
+
+    def handle(self, *args, **options):
+        count = suggestions.rebuild()
+        self.stdout.write(f'Подсказок: {count}')
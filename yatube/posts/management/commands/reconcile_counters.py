@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики пользователей и постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=counters.RECONCILE_BATCH,
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        authors = counters.reconcile_authors(batch_size)
+        posts = counters.reconcile_posts(batch_size)
+        self.stdout.write(
+            f'Исправлено пользователей: {authors}, постов: {posts}'
+        )
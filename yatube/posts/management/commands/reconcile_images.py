@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import blobs
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает ссылки постов на файлы картинок '
+            'и удаляет файлы без ссылок')
+
+    def handle(self, *args, **options):
+        removed = blobs.reconcile()
+        self.stdout.write(f'Удалено файлов: {removed}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из материализованной ленты записи без подписки '
+            'и досоздаёт недостающие')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id подписчика; можно указать несколько раз',
+        )
+
+    def handle(self, *args, **options):
+        removed, processed = timeline.repair(options['user_ids'])
+        self.stdout.write(
+            f'Удалено записей: {removed}, обработано подписок: {processed}'
+        )
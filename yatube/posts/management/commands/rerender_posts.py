@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.markup import render_text
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Заново готовит HTML текстов постов, например после '
+            'переключения POST_MARKDOWN')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.values_list('pk', 'text', 'html').iterator(
+            chunk_size=options['batch_size']
+        )
+        changed = 0
+        for pk, text, html in posts:
+            rendered = render_text(text)
+            if rendered != html:
+                # update() не трогает updated: ключ карточки и так
+                # зависит от POST_MARKDOWN.
+                Post.objects.filter(pk=pk).update(html=rendered)
+                changed += 1
+        self.stdout.write(f'Обновлено постов: {changed}')
@@ -0,0 +1,43 @@
+import re
+
+from django.conf import settings
+from django.utils.html import escape, linebreaks
+from django.utils.text import normalize_newlines
+
+POST_MARKDOWN = settings.POST_MARKDOWN
+PARAGRAPHS = re.compile(r'\n{2,}')
+CODE = re.compile(r'(`[^`\n]+`)')
+# В адресе нет звёздочек и кавычек: разметка не попадёт в атрибут.
+LINK = re.compile(r'\[([^\]\n]+)\]\((https?://[^\s()<>"*`]+)\)')
+STRONG = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+EMPHASIS = re.compile(r'\*(?=\S)(.+?)(?<=\S)\*')
+
+
+def inline(text):
+    """Разметка внутри абзаца; text уже экранирован."""
+    parts = CODE.split(text)
+    for index, part in enumerate(parts):
+        if index % 2:
+            parts[index] = f'<code>{part[1:-1]}</code>'
+            continue
+        part = LINK.sub(r'<a href="\2" rel="nofollow noopener">\1</a>', part)
+        part = STRONG.sub(r'<strong>\1</strong>', part)
+        parts[index] = EMPHASIS.sub(r'<em>\1</em>', part)
+    return ''.join(parts)
+
+
+def paragraph(text):
+    return '<p>{}</p>'.format(inline(escape(text)).replace('\n', '<br>'))
+
+
+def render_text(text):
+    """
+    HTML текста поста: абзацы и переносы как у фильтра linebreaks,
+    а при POST_MARKDOWN — ещё **жирный**, *курсив*, `код`
+    и [ссылки](https://...). Текст экранируется до разметки, поэтому
+    других тегов и атрибутов в результате не бывает.
+    """
+    if not POST_MARKDOWN:
+        return linebreaks(text, autoescape=True)
+    paragraphs = PARAGRAPHS.split(normalize_newlines(str(text)))
+    return '\n\n'.join(paragraph(text) for text in paragraphs)
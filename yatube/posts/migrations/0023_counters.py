@@ -0,0 +1,57 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    users = User.objects.annotate(
+        real_posts=models.Count('posts', distinct=True),
+        real_followers=models.Count('following', distinct=True),
+        real_following=models.Count('follower', distinct=True),
+    ).values_list('pk', 'real_posts', 'real_followers', 'real_following')
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk, posts_count=posts,
+                     followers_count=followers, following_count=following)
+         for pk, posts, followers, following in users.iterator()),
+        batch_size=1000,
+    )
+    for pk, comments in Post.objects.order_by().annotate(
+        real_comments=models.Count('commented')
+    ).filter(real_comments__gt=0).values_list('pk', 'real_comments'):
+        Post.objects.filter(pk=pk).update(comments_count=comments)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0022_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    duplicates = list(Follow.objects.values('user', 'author').annotate(
+        first=models.Min('pk'), copies=models.Count('pk')
+    ).filter(copies__gt=1).values_list('user', 'author', 'first'))
+    for user_id, author_id, first in duplicates:
+        Follow.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).exclude(pk=first).delete()
+    # 0023 посчитала подписки вместе с дублями: пересчитываем
+    # счётчики всех, кого дубли касались.
+    for user_id in {user_id for user_id, _, _ in duplicates}:
+        AuthorStats.objects.filter(user_id=user_id).update(
+            following_count=Follow.objects.filter(user_id=user_id).count()
+        )
+    for author_id in {author_id for _, author_id, _ in duplicates}:
+        AuthorStats.objects.filter(user_id=author_id).update(
+            followers_count=Follow.objects.filter(
+                author_id=author_id
+            ).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0023_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_follows,
+                             migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='timelineentry',
+            name='timeline_user_pub_date_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together={('user', 'author')},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='timeline_user_feed_idx'),
+        ),
+    ]
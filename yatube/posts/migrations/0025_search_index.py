@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# Копия posts.search на момент миграции: правки модуля
+# не должны менять уже применённую схему.
+INDEXES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+
+def index_statements(fts, table):
+    return (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+        f"text, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} '
+        f'BEGIN INSERT INTO {fts} (rowid, text) '
+        f'VALUES (new.id, new.text); END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} '
+        f"BEGIN INSERT INTO {fts} ({fts}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); END",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text '
+        f"ON {table} BEGIN INSERT INTO {fts} ({fts}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f'INSERT INTO {fts} (rowid, text) VALUES (new.id, new.text); END',
+    )
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts, table in INDEXES:
+        for statement in index_statements(fts, table):
+            schema_editor.execute(statement)
+        schema_editor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts, _ in INDEXES:
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
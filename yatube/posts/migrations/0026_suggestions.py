@@ -0,0 +1,82 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:49
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Копия posts.suggestions на момент миграции.
+KEY_LENGTH = 300
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKC', text).casefold().replace('ё', 'е')
+    return ' '.join(text.split())[:KEY_LENGTH]
+
+
+def user_entries(user):
+    full_name = f'{user.first_name} {user.last_name}'.strip()
+    label = f'{full_name} ({user.username})' if full_name else user.username
+    keys = {normalize(name)
+            for name in (user.username, full_name, user.last_name)}
+    return [(key, label, user.username) for key in sorted(keys) if key]
+
+
+def group_entries(group):
+    words = group.title.split()
+    keys = {normalize(' '.join(words[i:])) for i in range(len(words))}
+    keys.add(normalize(group.slug))
+    return [(key, group.title, group.slug) for key in sorted(keys) if key]
+
+
+def fill_suggestions(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Group = apps.get_model('posts', 'Group')
+    Suggestion = apps.get_model('posts', 'Suggestion')
+    rows = [
+        Suggestion(kind='user', object_id=user.pk, key=key, label=label,
+                   value=value)
+        for user in User.objects.iterator()
+        for key, label, value in user_entries(user)
+    ] + [
+        Suggestion(kind='group', object_id=group.pk, key=key, label=label,
+                   value=value)
+        for group in Group.objects.iterator()
+        for key, label, value in group_entries(group)
+    ]
+    Suggestion.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0025_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('group', 'Группа')], max_length=5, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('key', models.CharField(max_length=300, verbose_name='Ключ')),
+                ('label', models.CharField(max_length=300, verbose_name='Подпись')),
+                ('value', models.CharField(max_length=150, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Подсказка',
+                'verbose_name_plural': 'Подсказки',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['key', 'kind', 'object_id'], name='suggestion_key_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='suggestion',
+            unique_together={('kind', 'object_id', 'key')},
+        ),
+        migrations.RunPython(fill_suggestions, migrations.RunPython.noop),
+    ]
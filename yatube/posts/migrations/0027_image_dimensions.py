@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:55
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_dimensions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    for pk, name in Post.objects.exclude(image='').values_list(
+        'pk', 'image'
+    ).iterator():
+        try:
+            with default_storage.open(name) as file:
+                width, height = Image.open(file).size
+        except OSError:
+            continue
+        Post.objects.filter(pk=pk).update(image_width=width,
+                                          image_height=height)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(fill_dimensions, migrations.RunPython.noop),
+    ]
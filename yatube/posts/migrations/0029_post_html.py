@@ -0,0 +1,68 @@
+# Generated by Django 2.2.28 on 2026-10-18 05:23
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils.html import escape, linebreaks
+from django.utils.text import normalize_newlines
+
+# Копия posts.markup на момент миграции: правки разметки
+# не должны менять то, что миграция записала в html.
+PARAGRAPHS = re.compile(r'\n{2,}')
+CODE = re.compile(r'(`[^`\n]+`)')
+LINK = re.compile(r'\[([^\]\n]+)\]\((https?://[^\s()<>"*`]+)\)')
+STRONG = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+EMPHASIS = re.compile(r'\*(?=\S)(.+?)(?<=\S)\*')
+
+
+def inline(text):
+    parts = CODE.split(text)
+    for index, part in enumerate(parts):
+        if index % 2:
+            parts[index] = f'<code>{part[1:-1]}</code>'
+            continue
+        part = LINK.sub(r'<a href="\2" rel="nofollow noopener">\1</a>', part)
+        part = STRONG.sub(r'<strong>\1</strong>', part)
+        parts[index] = EMPHASIS.sub(r'<em>\1</em>', part)
+    return ''.join(parts)
+
+
+def paragraph(text):
+    return '<p>{}</p>'.format(inline(escape(text)).replace('\n', '<br>'))
+
+
+def render_text(text):
+    if not getattr(settings, 'POST_MARKDOWN', False):
+        return linebreaks(text, autoescape=True)
+    paragraphs = PARAGRAPHS.split(normalize_newlines(str(text)))
+    return '\n\n'.join(paragraph(text) for text in paragraphs)
+
+
+def fill_html(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+    for pk, text in Post.objects.values_list('pk', 'text').iterator():
+        Post.objects.filter(pk=pk).update(html=render_text(text))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0028_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(fill_html, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.functional import cached_property
+
+from .links import post_links
+from .markup import render_text
+from .storage import ContentAddressedStorage
 
 
 User = get_user_model()
@@ -23,6 +28,8 @@ class Post(models.Model):
                             help_text='Текст нового поста'
                             )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+    html = models.TextField('HTML текста', blank=True, editable=False)
     group = models.ForeignKey(
         Group,
         on_delete=models.SET_NULL,
@@ -41,18 +48,51 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         help_text='Загрузите изображение',
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', blank=True, null=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', blank=True, null=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев', default=0, editable=False
+    )
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date',)
+        # Поля индексов по возрастанию: SQLite читает их в обратном
+        # порядке и отдаёт ORDER BY pub_date DESC, id DESC без сортировки.
+        indexes = (
+            models.Index(fields=('pub_date',), name='post_pub_date_idx'),
+            models.Index(fields=('author', 'pub_date'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', 'pub_date'),
+                         name='post_group_pub_date_idx'),
+        )
 
     def __str__(self):
         return self.text[0:14]
 
+    def save(self, *args, **kwargs):
+        # HTML текста готовится при записи, а не при каждом показе.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.html = render_text(self.text)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'html', 'updated'}
+        super().save(*args, **kwargs)
+
+    @cached_property
+    def links(self):
+        """URL для карточки, посчитанные один раз на пост."""
+        return post_links(self)
+
 
 class Comment(models.Model):
     text = models.TextField(verbose_name='Комментарий',
@@ -75,6 +115,10 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('post', 'created'),
+                         name='comment_post_created_idx'),
+        )
 
     def __str__(self):
         return self.text[0:14]
@@ -96,6 +140,111 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписку'
         verbose_name_plural = 'Подписки'
+        unique_together = ('user', 'author')
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class AuthorStats(models.Model):
+    """
+    Денормализованные счётчики пользователя. Поддерживаются сигналами
+    через F-выражения, расхождения чинит reconcile_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.user}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Материализованная лента подписок: пост автора, раскладываемый
+    каждому подписчику при публикации и при оформлении подписки.
+    pub_date копируется из поста, чтобы лента читалась по индексу.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(fields=('user', 'pub_date', 'post'),
+                         name='timeline_user_feed_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class Suggestion(models.Model):
+    """
+    Ключ автодополнения: нормализованное имя пользователя или группы.
+    Поиск по префиксу идёт диапазоном по индексу key, строки
+    поддерживаются сигналами при изменении пользователей и групп.
+    """
+    USER = 'user'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField('Тип', max_length=5, choices=KINDS)
+    object_id = models.PositiveIntegerField('ID объекта')
+    key = models.CharField('Ключ', max_length=300)
+    label = models.CharField('Подпись', max_length=300)
+    value = models.CharField('Значение', max_length=150)
+
+    class Meta:
+        verbose_name = 'Подсказка'
+        verbose_name_plural = 'Подсказки'
+        unique_together = ('kind', 'object_id', 'key')
+        indexes = (
+            models.Index(fields=('key', 'kind', 'object_id'),
+                         name='suggestion_key_idx'),
+        )
+
+    def __str__(self):
+        return self.label
+
+
+class ImageBlob(models.Model):
+    """
+    Файл картинки в хранилище по содержимому и число постов,
+    которые на него ссылаются. Последний ушедший пост удаляет файл.
+    """
+    name = models.CharField('Файл', max_length=100, unique=True)
+    refs = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
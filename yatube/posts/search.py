@@ -0,0 +1,139 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+WORDS = re.compile(r'\w+', re.UNICODE)
+# Таблицы FTS5 с внешним содержимым: текст хранится только в исходной
+# таблице, индекс синхронизируют триггеры.
+INDEXES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def index_statements(fts, table):
+    return (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+        f"text, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} '
+        f'BEGIN INSERT INTO {fts} (rowid, text) '
+        f'VALUES (new.id, new.text); END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} '
+        f"BEGIN INSERT INTO {fts} ({fts}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); END",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text '
+        f"ON {table} BEGIN INSERT INTO {fts} ({fts}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f'INSERT INTO {fts} (rowid, text) VALUES (new.id, new.text); END',
+    )
+
+
+def ensure_index(using_connection=None):
+    """
+    Создаёт таблицы и триггеры, если их нет. Вызывается после каждой
+    миграции: SQLite пересоздаёт таблицу при изменении схемы,
+    и триггеры исходной таблицы при этом пропадают.
+    """
+    db = using_connection or connection
+    if db.vendor != 'sqlite':
+        return
+    tables = db.introspection.table_names()
+    with db.cursor() as cursor:
+        for fts, table in INDEXES:
+            if table not in tables:
+                continue
+            for statement in index_statements(fts, table):
+                cursor.execute(statement)
+
+
+def rebuild_index():
+    ensure_index()
+    with connection.cursor() as cursor:
+        for fts, _ in INDEXES:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """
+    Безопасное выражение MATCH: каждое слово в кавычках,
+    последнее — как префикс, чтобы искать по мере набора.
+    """
+    words = WORDS.findall(query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def matching_ids(fts, expression):
+    return RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s',
+                  (expression,))
+
+
+class SearchResults:
+    """
+    Посты, найденные по тексту поста или его комментариев,
+    упорядоченные по bm25. Поддерживает count() и срезы,
+    поэтому подходит для Paginator.
+    """
+    RANKED = (
+        'SELECT post_id, MIN(rank) AS best FROM ('
+        ' SELECT rowid AS post_id, bm25(posts_post_fts) AS rank'
+        ' FROM posts_post_fts WHERE posts_post_fts MATCH %s'
+        ' UNION ALL'
+        ' SELECT c.post_id, bm25(posts_comment_fts)'
+        ' FROM posts_comment_fts'
+        ' JOIN posts_comment c ON c.id = posts_comment_fts.rowid'
+        ' WHERE posts_comment_fts MATCH %s'
+        ') GROUP BY post_id'
+    )
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+
+    def count(self):
+        if not self.expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM ({self.RANKED})',
+                           (self.expression, self.expression))
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.expression:
+            return []
+        start = index.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{self.RANKED} ORDER BY best, post_id DESC '
+                f'LIMIT %s OFFSET %s',
+                (self.expression, self.expression,
+                 index.stop - start, start),
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def filter_by_text(queryset, fts, query):
+    """Фильтр для админки: по индексу FTS5, а без SQLite — через LIKE."""
+    if not search_available():
+        return queryset.filter(text__icontains=query)
+    expression = match_expression(query)
+    if not expression:
+        return queryset
+    return queryset.filter(pk__in=matching_ids(fts, expression))
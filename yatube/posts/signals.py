@@ -0,0 +1,209 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, counters, suggestions, thumbnails, timeline
+from .generations import (COMMENTS_SCOPE, GLOBAL_SCOPE, author_scope,
+                          bump_generations, group_scope, post_scope,
+                          post_scopes)
+from .models import AuthorStats, Comment, Follow, Group, Post, Suggestion
+from .utils import invalidate_counts
+
+User = get_user_model()
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+# Счётчики регистрируются раньше ленты: раскладка постов
+# опирается на актуальное число подписчиков автора.
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.bump_author(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.bump_author(instance.author_id, followers_count=1)
+        counters.bump_author(instance.user_id, following_count=1)
+        timeline.rebalance(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, followers_count=-1)
+    counters.bump_author(instance.user_id, following_count=-1)
+    timeline.rebalance(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def reset_page_counts(sender, **kwargs):
+    invalidate_counts(sender)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_scopes(sender, instance, raw, **kwargs):
+    if instance.pk is None or raw:
+        return
+    instance._previous_scopes = []
+    for group_id, author_id, image in Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', 'author_id', 'image'):
+        instance._previous_scopes += post_scopes(group_id, author_id)
+        instance._previous_image = image
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_feeds(sender, instance, **kwargs):
+    bump_generations(
+        post_scope(instance.pk),
+        *post_scopes(instance.group_id, instance.author_id),
+        *getattr(instance, '_previous_scopes', ()),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_post(sender, instance, **kwargs):
+    bump_generations(post_scope(instance.post_id), COMMENTS_SCOPE)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_feeds(sender, instance, **kwargs):
+    # Название группы есть и в карточках на страницах её авторов.
+    authors = Post.objects.filter(group_id=instance.pk).order_by(
+    ).values_list('author_id', flat=True).distinct()
+    bump_generations(GLOBAL_SCOPE, group_scope(instance.pk),
+                     *(author_scope(author_id) for author_id in authors))
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, raw, update_fields, **kwargs):
+    if (raw or instance.pk is None
+            or update_fields and not set(update_fields) & set(NAME_FIELDS)):
+        return
+    instance._previous_names = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def bump_author_feeds(sender, instance, **kwargs):
+    """Карточки постов показывают имя автора и ссылку на профиль."""
+    previous = instance.__dict__.pop('_previous_names', None)
+    names = tuple(getattr(instance, field) for field in NAME_FIELDS)
+    if previous is None or previous == names:
+        return
+    groups = Post.objects.filter(
+        author_id=instance.pk, group__isnull=False
+    ).order_by().values_list('group_id', flat=True).distinct()
+    bump_generations(GLOBAL_SCOPE, author_scope(instance.pk),
+                     *(group_scope(group_id) for group_id in groups))
+
+
+@receiver(post_save, sender=User)
+def sync_user_suggestions(sender, instance, raw, update_fields, **kwargs):
+    # Вход пользователя сохраняет только last_login.
+    if raw or update_fields and not set(update_fields) & set(NAME_FIELDS):
+        return
+    suggestions.sync_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def drop_user_suggestions(sender, instance, **kwargs):
+    suggestions.drop(Suggestion.USER, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def sync_group_suggestions(sender, instance, raw, **kwargs):
+    if not raw:
+        suggestions.sync_group(instance)
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_suggestions(sender, instance, **kwargs):
+    suggestions.drop(Suggestion.GROUP, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, raw, **kwargs):
+    """
+    Новый файл поста, загруженный или присвоенный по имени, получает
+    ссылку здесь, вместе с сохранением поста, а прежний её теряет.
+    То же содержимое под тем же именем ссылок не меняет.
+    """
+    if raw:
+        return
+    name = instance.image.name
+    previous = getattr(instance, '_previous_image', '')
+    if name == previous:
+        return
+    if name:
+        instance.image.storage.claim(name)
+    if previous:
+        transaction.on_commit(lambda: blobs.release(previous))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: blobs.release(name))
+
+
+@receiver(request_finished)
+def wait_for_thumbnails(**kwargs):
+    """
+    При THUMBNAIL_WAIT (в тестах) запрос завершается, только когда пул
+    создал миниатюры: после теста никто не пишет в его MEDIA_ROOT.
+    """
+    if settings.THUMBNAIL_WAIT:
+        thumbnails.wait()
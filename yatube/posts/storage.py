@@ -0,0 +1,81 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+import threading
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, где имя файла — SHA-256 содержимого:
+    upload_to/ab/abcdef….ext. Одинаковые загрузки превращаются в один
+    файл, а ImageBlob считает ссылающиеся на него посты. Файл пишется
+    во временный и переименовывается, поэтому одновременные загрузки
+    одного содержимого безопасны.
+
+    save только пишет файл и запоминает его содержимое в потоке.
+    Ссылку добавляет claim из сигнала сохранения поста, поэтому
+    пост, который не сохранился, ссылки не оставляет.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    def claim(self, name):
+        """
+        Добавляет ссылку на name. Если последняя ссылка успела удалить
+        файл после save, он пишется заново из запомненного содержимого:
+        под той же блокировкой, что и release, гонки нет.
+        """
+        from .blobs import retain
+        written = getattr(self._local, 'written', None)
+        self._local.written = None
+        with transaction.atomic():
+            retain(name)
+            if (written is not None and written[0] == name
+                    and not self.exists(name)):
+                self.write(name, written[1])
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(posixpath.dirname(name), digest[:2],
+                              f'{digest}{extension}')
+
+    def write(self, name, content):
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory,
+                                                 prefix='.upload-')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        # Запись вне транзакции, чтобы не держать блокировку БД.
+        if not self.exists(name):
+            self.write(name, content)
+        self._local.written = (name, content)
+        return name
@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.base import TextNode
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+from django.template.loader import get_template
+from django.template.loader_tags import (
+    BLOCK_CONTEXT_KEY, BlockContext, BlockNode, ExtendsNode
+)
+
+STREAMING_RENDER = settings.STREAMING_RENDER
+# Метка в потоке фрагментов: накопленное можно отправлять клиенту.
+FLUSH = object()
+
+
+def render_listing(request, template_name, context):
+    """
+    render() для страниц-лент; при STREAMING_RENDER страница уходит
+    по частям: сначала шапка, затем по одной карточке поста.
+    """
+    if not STREAMING_RENDER:
+        return render(request, template_name, context)
+    return StreamingHttpResponse(
+        stream_template(template_name, context, request)
+    )
+
+
+def stream_template(template_name, context=None, request=None):
+    """
+    Отрисовывает шаблон кусками, склеивая текст между метками FLUSH.
+    Склеенный вывод совпадает с обычным render().
+    """
+    template = get_template(template_name).template
+    context = make_context(context, request,
+                           autoescape=template.engine.autoescape)
+    buffer = []
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            for chunk in stream_nodelist(template.nodelist, context):
+                if chunk is not FLUSH:
+                    buffer.append(chunk)
+                elif buffer:
+                    yield ''.join(buffer)
+                    buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_nodelist(nodelist, context):
+    """
+    Как NodeList.render, но генератор. Узлы с методом stream(context)
+    и встроенные extends/block/for разворачиваются рекурсивно,
+    остальные отрисовываются целиком.
+    """
+    for node in nodelist:
+        if type(node) in STREAMERS:
+            yield from STREAMERS[type(node)](node, context)
+        elif hasattr(node, 'stream'):
+            yield from node.stream(context)
+        else:
+            bit = str(node.render_annotated(context))
+            if bit:
+                yield bit
+
+
+def stream_extends(node, context):
+    # Повторяет ExtendsNode.render, но отдаёт родителя по частям.
+    parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+    for parent_node in parent.nodelist:
+        if not isinstance(parent_node, TextNode):
+            if not isinstance(parent_node, ExtendsNode):
+                block_context.add_blocks({
+                    block.name: block
+                    for block in parent.nodelist.get_nodes_by_type(BlockNode)
+                })
+            break
+    with context.render_context.push_state(parent, isolated_context=False):
+        yield from stream_nodelist(parent.nodelist, context)
+
+
+def stream_block(node, context):
+    # Повторяет BlockNode.render.
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    with context.push():
+        if block_context is None:
+            context['block'] = node
+            yield from stream_nodelist(node.nodelist, context)
+            return
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        block = type(node)(block.name, block.nodelist)
+        block.context = context
+        context['block'] = block
+        yield from stream_nodelist(block.nodelist, context)
+        if push is not None:
+            block_context.push(node.name, push)
+
+
+def stream_for(node, context):
+    """
+    Повторяет ForNode.render для одной переменной цикла и отправляет
+    клиенту всё накопленное перед каждой итерацией.
+    """
+    if len(node.loopvars) > 1:
+        yield str(node.render_annotated(context))
+        return
+    parentloop = context['forloop'] if 'forloop' in context else {}
+    with context.push():
+        values = node.sequence.resolve(context, ignore_failures=True)
+        values = list(values) if values is not None else []
+        if not values:
+            yield str(node.nodelist_empty.render(context))
+            return
+        if node.is_reversed:
+            values.reverse()
+        total = len(values)
+        loop = context['forloop'] = {'parentloop': parentloop}
+        for i, item in enumerate(values):
+            loop.update(counter0=i, counter=i + 1, revcounter=total - i,
+                        revcounter0=total - i - 1, first=i == 0,
+                        last=i == total - 1)
+            context[node.loopvars[0]] = item
+            yield FLUSH
+            yield from stream_nodelist(node.nodelist_loop, context)
+
+
+STREAMERS = {
+    ExtendsNode: stream_extends,
+    BlockNode: stream_block,
+    ForNode: stream_for,
+}
@@ -0,0 +1,112 @@
+import unicodedata
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Min
+from django.urls import reverse
+
+from .models import Group, Suggestion
+
+User = get_user_model()
+AUTOCOMPLETE_LIMIT = settings.AUTOCOMPLETE_LIMIT
+KEY_LENGTH = Suggestion._meta.get_field('key').max_length
+# Больше любого символа: верхняя граница диапазона по префиксу.
+PREFIX_END = chr(0x10FFFF)
+
+
+def normalize(text):
+    """Ключ для сравнения: без регистра, ё как е, пробелы схлопнуты."""
+    text = unicodedata.normalize('NFKC', text).casefold().replace('ё', 'е')
+    return ' '.join(text.split())[:KEY_LENGTH]
+
+
+def user_entries(user):
+    """(key, label, value) для пользователя: логин, полное имя, фамилия."""
+    full_name = f'{user.first_name} {user.last_name}'.strip()
+    label = f'{full_name} ({user.username})' if full_name else user.username
+    keys = {normalize(name)
+            for name in (user.username, full_name, user.last_name)}
+    return [(key, label, user.username) for key in sorted(keys) if key]
+
+
+def group_entries(group):
+    """(key, label, value) для группы: название и его последние слова."""
+    words = group.title.split()
+    keys = {normalize(' '.join(words[i:])) for i in range(len(words))}
+    keys.add(normalize(group.slug))
+    return [(key, group.title, group.slug) for key in sorted(keys) if key]
+
+
+def sync(kind, object_id, entries):
+    with transaction.atomic():
+        Suggestion.objects.filter(kind=kind, object_id=object_id).delete()
+        Suggestion.objects.bulk_create(
+            Suggestion(kind=kind, object_id=object_id, key=key,
+                       label=label, value=value)
+            for key, label, value in entries
+        )
+
+
+def sync_user(user):
+    sync(Suggestion.USER, user.pk, user_entries(user))
+
+
+def sync_group(group):
+    sync(Suggestion.GROUP, group.pk, group_entries(group))
+
+
+def drop(kind, object_id):
+    Suggestion.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild():
+    """Пересоздаёт все подсказки, например после bulk-операций."""
+    with transaction.atomic():
+        Suggestion.objects.all().delete()
+        Suggestion.objects.bulk_create(
+            [
+                Suggestion(kind=Suggestion.USER, object_id=user.pk, key=key,
+                           label=label, value=value)
+                for user in User.objects.only(
+                    'username', 'first_name', 'last_name'
+                ).iterator()
+                for key, label, value in user_entries(user)
+            ] + [
+                Suggestion(kind=Suggestion.GROUP, object_id=group.pk,
+                           key=key, label=label, value=value)
+                for group in Group.objects.only('title', 'slug').iterator()
+                for key, label, value in group_entries(group)
+            ],
+            batch_size=500,
+        )
+    return Suggestion.objects.count()
+
+
+def suggest(prefix, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Не больше limit объектов, у которых какой-то ключ начинается
+    с prefix, по первому подходящему ключу. Один запрос: диапазон
+    по индексу (key, kind, object_id) и GROUP BY по объекту, потому
+    что у объекта бывает сколько угодно ключей с одним префиксом.
+    """
+    prefix = normalize(prefix)
+    limit = max(0, min(limit, AUTOCOMPLETE_LIMIT))
+    if not prefix or not limit:
+        return []
+    rows = Suggestion.objects.filter(
+        key__gte=prefix, key__lt=prefix + PREFIX_END
+    ).values('kind', 'object_id', 'label', 'value').annotate(
+        first_key=Min('key')
+    ).order_by('first_key', 'kind', 'object_id').values_list(
+        'kind', 'label', 'value'
+    )[:limit]
+    results = []
+    for kind, label, value in rows:
+        url = (reverse('posts:profile', args=(value,))
+               if kind == Suggestion.USER
+               else reverse('posts:group_list', args=(value,)))
+        results.append(
+            {'type': kind, 'label': label, 'value': value, 'url': url}
+        )
+    return results
@@ -0,0 +1,74 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from .. import markup, thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_form.html'
+# Переменные страницы, от которых зависит вид карточки.
+CARD_CONTEXT = ('author', 'group', 'forloop')
+CARD_CACHE_TTL = settings.FEED_CACHE_TTL
+
+
+def card_key(post, values):
+    """
+    Ключ карточки: пост и время его изменения, а также то, что
+    карточка берёт со страницы и из связанных записей.
+    У несохранённого поста версии нет, и карточка не кэшируется.
+    """
+    if post.updated is None:
+        return None
+    forloop = values['forloop'] or {}
+    raw = ':'.join(str(part) for part in (
+        post.pk, post.updated.isoformat(), markup.POST_MARKDOWN,
+        bool(values['author']), bool(values['group']),
+        bool(forloop.get('last')), post.author.username,
+        post.author.get_full_name(),
+        *((post.group.slug, post.group.title) if post.group_id else ()),
+    ))
+    return f'post_card:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+class PostCardNode(template.Node):
+    def __init__(self, post):
+        self.post = post
+
+    def render(self, context):
+        values = {name: context.get(name) for name in CARD_CONTEXT}
+        post = values['post'] = self.post.resolve(context)
+        key = card_key(post, values)
+        html = None if key is None else cache.get(key)
+        if html is not None:
+            return html
+        card = context.render_context.get(self)
+        if card is None:
+            card = context.template.engine.get_template(CARD_TEMPLATE)
+            context.render_context[self] = card
+        html = card.render(context.new(values))
+        # Заглушку вместо миниатюры не кэшируем: она скоро сменится.
+        if key is not None and thumbnails.is_ready(post):
+            cache.set(key, html, CARD_CACHE_TTL)
+        return html
+
+
+@register.tag('post_card')
+def do_post_card(parser, token):
+    """
+    Карточка поста для лент, то же, что {% include CARD_TEMPLATE %}::
+
+        {% post_card post %}
+
+    Готовая карточка берётся из кэша по посту и его полю updated.
+    Иначе шаблон ищется один раз на страницу и отрисовывается
+    в маленьком контексте из post и CARD_CONTEXT.
+    """
+    tokens = token.split_contents()
+    if len(tokens) != 2:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires exactly 1 argument.'
+        )
+    return PostCardNode(parser.compile_filter(tokens[1]))
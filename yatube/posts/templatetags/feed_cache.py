@@ -0,0 +1,72 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from ..generations import get_generation
+from ..streaming import FLUSH, stream_nodelist
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, scope, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.scope = scope
+        self.vary_on = vary_on
+
+    def cache_key(self, context):
+        scope = self.scope.resolve(context)
+        vary_on = [scope, get_generation(scope)]
+        vary_on.extend(var.resolve(context) for var in self.vary_on)
+        return make_template_fragment_key(self.fragment_name, vary_on)
+
+    def render(self, context):
+        cache_key = self.cache_key(context)
+        value = cache.get(cache_key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(cache_key, value, settings.FEED_CACHE_TTL)
+        return value
+
+    def stream(self, context):
+        yield FLUSH
+        cache_key = self.cache_key(context)
+        value = cache.get(cache_key)
+        if value is not None:
+            yield value
+            return
+        parts = []
+        for chunk in stream_nodelist(self.nodelist, context):
+            if chunk is not FLUSH:
+                parts.append(chunk)
+            yield chunk
+        cache.set(cache_key, ''.join(parts), settings.FEED_CACHE_TTL)
+
+
+@register.tag('feedcache')
+def do_feedcache(parser, token):
+    """
+    Кэширует фрагмент ленты до изменения её постов::
+
+        {% feedcache fragment_name scope [var1] [var2] .. %}
+        {% endfeedcache %}
+
+    scope — имя ленты из posts.generations; поколение ленты входит
+    в ключ, поэтому сохранение или удаление поста сразу делает
+    фрагмент устаревшим, а FEED_CACHE_TTL лишь ограничивает память.
+    """
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.'
+        )
+    return FeedCacheNode(
+        nodelist,
+        tokens[1],
+        parser.compile_filter(tokens[2]),
+        [parser.compile_filter(t) for t in tokens[3:]],
+    )
@@ -0,0 +1,62 @@
+from django import template
+from django.conf import settings
+
+from .. import thumbnails, variants
+from ..streaming import FLUSH, stream_nodelist
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def picture(post, thumbnail):
+    """
+    Адаптивная картинка поста: <picture> с srcset вариантов в WebP
+    и исходном формате. thumbnail — готовая миниатюра sorl: она служит
+    src для старых браузеров и признаком того, что варианты созданы.
+    Ширины берутся из размеров в посте, файл не открывается.
+    """
+    name, width = post.image.name, post.image_width
+    storage = post.image.storage
+    return {
+        'src': thumbnail.url,
+        'width': thumbnail.width,
+        'height': thumbnail.height,
+        'sizes': settings.IMAGE_VARIANT_SIZES,
+        'webp_srcset': variants.srcset(name, 'WEBP', width, storage),
+        'srcset': variants.srcset(name, variants.original_format(name),
+                                  width, storage),
+    }
+
+
+class PrefetchThumbnailsNode(template.Node):
+    def __init__(self, nodelist, posts):
+        self.nodelist = nodelist
+        self.posts = posts
+
+    def render(self, context):
+        with thumbnails.prefetched(list(self.posts.resolve(context))):
+            return self.nodelist.render(context)
+
+    def stream(self, context):
+        yield FLUSH
+        with thumbnails.prefetched(list(self.posts.resolve(context))):
+            yield from stream_nodelist(self.nodelist, context)
+
+
+@register.tag('prefetch_thumbnails')
+def do_prefetch_thumbnails(parser, token):
+    """
+    Загружает метаданные миниатюр всех постов страницы одним
+    обращением к кэшу до отрисовки тегов {% thumbnail %}::
+
+        {% prefetch_thumbnails page_obj %}
+        {% endprefetch_thumbnails %}
+    """
+    nodelist = parser.parse(('endprefetch_thumbnails',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) != 2:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires exactly 1 argument.'
+        )
+    return PrefetchThumbnailsNode(nodelist, parser.compile_filter(tokens[1]))
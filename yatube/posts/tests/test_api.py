@@ -0,0 +1,168 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+Q_OF_POSTS = 7
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='api_author', first_name='Апи', last_name='Автор'
+        )
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(title='Апи', slug='api')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}',
+                                group=cls.group if number % 2 else None)
+            for number in range(Q_OF_POSTS)
+        ]
+        cls.post = cls.posts[-1]
+        for number in range(3):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {number}')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'posts:{name}', args=args), params)
+
+    def test_feeds(self):
+        """Ленты отдают те же посты, что и HTML-страницы"""
+        feeds = {
+            ('api_feed',): Post.objects.all(),
+            ('api_group', self.group.slug): self.group.posts.all(),
+            ('api_profile', self.author.username): self.author.posts.all(),
+        }
+        for (name, *args), posts in feeds.items():
+            with self.subTest(name=name):
+                data = self.get(name, *args, limit=100).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    list(posts.order_by('-pub_date', '-id')
+                         .values_list('pk', flat=True)),
+                )
+        data = self.get('api_group', self.group.slug).json()
+        self.assertEqual(data['group']['title'], self.group.title)
+
+    def test_embedded_objects(self):
+        """Автор и группа вложены в пост"""
+        data = self.get('api_post', self.posts[1].pk).json()
+        self.assertEqual(data['version'], 'v1')
+        self.assertEqual(data['author'], {
+            'username': 'api_author',
+            'full_name': 'Апи Автор',
+            'url': reverse('posts:api_profile', args=('api_author',)),
+        })
+        self.assertEqual(data['group']['slug'], self.group.slug)
+        self.assertEqual(data['html'], '<p>Пост 1</p>')
+        self.assertIsNone(data['image'])
+
+    def test_cursor_pages(self):
+        """Курсор проходит ленту без пропусков и повторов"""
+        seen, url = [], reverse('posts:api_feed') + '?limit=3&fields=id'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+        self.assertIsNotNone(data['previous'])
+
+    def test_fields(self):
+        """?fields= выбирает поля ответа и колонки запроса"""
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get('api_feed', fields='id,text').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"html"', sql)
+        response = self.get('api_feed', fields='id,password')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['error'])
+
+    def test_no_n_plus_one(self):
+        """Вложенные объекты загружаются одним запросом на страницу"""
+        self.get('api_feed')
+        with CaptureQueriesContext(connection) as queries:
+            self.get('api_feed', limit=100)
+        expected = len(queries)
+        for post in self.posts[:3]:
+            Post.objects.create(author=self.reader, group=self.group,
+                                text=post.text)
+        cache.clear()
+        self.get('api_feed')
+        with self.assertNumQueries(expected):
+            self.get('api_feed', limit=100)
+
+    def test_comments(self):
+        """Комментарии поста по курсору с авторами"""
+        data = self.get('api_comments', self.post.pk, limit=2).json()
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         ['Комментарий 2', 'Комментарий 1'])
+        self.assertEqual(data['results'][0]['author']['username'],
+                         'api_reader')
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), 1)
+
+    def test_etag(self):
+        """Повторный запрос с ETag получает 304, правка поста — 200"""
+        url = reverse('posts:api_post', args=(self.post.pk,))
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.post.text = 'Правка'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['text'], 'Правка')
+
+    def test_feed_etag_tracks_comments(self):
+        """Новый комментарий меняет comments_count в лентах: не 304"""
+        feeds = (
+            ('api_feed',),
+            ('api_group', self.group.slug),
+            ('api_profile', self.author.username),
+        )
+        post = self.posts[1]
+        etags = {}
+        for name, *args in feeds:
+            etags[name] = self.get(name, *args)['ETag']
+        Comment.objects.create(post=post, author=self.reader, text='Новый')
+        for name, *args in feeds:
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(f'posts:{name}', args=args),
+                    HTTP_IF_NONE_MATCH=etags[name],
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                counts = {item['id']: item['comments_count']
+                          for item in response.json()['results']}
+                self.assertEqual(counts[post.pk], 1)
+
+    def test_errors(self):
+        """Ошибки API отдаются в JSON"""
+        responses = {
+            self.get('api_post', 0): HTTPStatus.NOT_FOUND,
+            self.get('api_group', 'missing'): HTTPStatus.NOT_FOUND,
+            self.get('api_feed', limit='x'): HTTPStatus.BAD_REQUEST,
+            self.client.post(reverse('posts:api_feed')):
+                HTTPStatus.METHOD_NOT_ALLOWED,
+        }
+        for response, status in responses.items():
+            with self.subTest(status=status):
+                self.assertEqual(response.status_code, status)
+        self.assertIn('error', self.get('api_post', 0).json())
+        response = self.client.delete(reverse('posts:api_post',
+                                              args=(self.post.pk,)))
+        self.assertEqual(response['Allow'], 'GET, HEAD')
+        self.assertIn('DELETE', response.json()['error'])
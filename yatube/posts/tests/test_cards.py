@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+from django.urls import clear_script_prefix, reverse, set_script_prefix
+
+from ..links import fast_reverse
+from ..models import Group, Post
+
+User = get_user_model()
+LINKS = (
+    ('posts:post_detail', 42),
+    ('posts:profile', 'plain_user'),
+    ('posts:profile', 'Иван.Петров+1@почта'),
+    ('posts:group_list', 'cats-2'),
+)
+
+
+class FastReverseTest(SimpleTestCase):
+    def test_same_as_reverse(self):
+        """Подстановка в готовый URL даёт то же, что reverse()"""
+        for prefix in ('/', '/yatube/'):
+            set_script_prefix(prefix)
+            try:
+                for view_name, value in LINKS:
+                    with self.subTest(prefix=prefix, value=value):
+                        self.assertEqual(
+                            fast_reverse(view_name, value),
+                            reverse(view_name, args=(value,)),
+                        )
+            finally:
+                clear_script_prefix()
+
+
+class PostCardTest(TestCase):
+    LOOP = ('{% load cards %}{% for post in posts %}'
+            '{% CARD %}{% endfor %}')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Автор.карточки',
+                                              first_name='Автор')
+        cls.group = Group.objects.create(title='Карточки', slug='cards')
+        Post.objects.create(author=cls.author, text='Без группы <b>')
+        Post.objects.create(author=cls.author, group=cls.group,
+                            text='В группе\n\nдва абзаца')
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, card, **context):
+        loop = Template(self.LOOP.replace('{% CARD %}', card))
+        posts = Post.objects.select_related('author', 'group')
+        return loop.render(Context({'posts': posts, **context}))
+
+    def test_same_as_include(self):
+        """{% post_card %} выводит то же, что include карточки"""
+        pages = ({}, {'author': self.author}, {'group': self.group})
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertEqual(
+                    self.render('{% post_card post %}', **page),
+                    self.render('{% include "posts/includes/post_form.html" '
+                                '%}', **page),
+                )
+
+    def test_links_and_separator(self):
+        """Ссылки карточки и разделитель между карточками"""
+        html = self.render('{% post_card post %}')
+        self.assertIn(reverse('posts:profile', args=(self.author,)), html)
+        self.assertIn(reverse('posts:group_list', args=(self.group.slug,)),
+                      html)
+        self.assertEqual(html.count('<hr>'), 1)
+
+    def test_cached_by_version(self):
+        """Карточка берётся из кэша, пока пост не сохранён заново"""
+        self.render('{% post_card post %}')
+        post = Post.objects.get(group=self.group)
+        Post.objects.filter(pk=post.pk).update(text='Мимо save()')
+        self.assertNotIn('Мимо save()', self.render('{% post_card post %}'))
+        post.text = 'Через save()'
+        post.save()
+        self.assertIn('Через save()', self.render('{% post_card post %}'))
+
+    def test_cache_depends_on_page(self):
+        """Карточки ленты автора и группы не берутся из кэша общей ленты"""
+        profile = reverse('posts:profile', args=(self.author,))
+        group = reverse('posts:group_list', args=(self.group.slug,))
+        self.assertIn(profile, self.render('{% post_card post %}'))
+        html = self.render('{% post_card post %}', author=self.author)
+        self.assertNotIn(profile, html)
+        self.assertIn(group, html)
+        html = self.render('{% post_card post %}', group=self.group)
+        self.assertIn(profile, html)
+        self.assertNotIn(group, html)
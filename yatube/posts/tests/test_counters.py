@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counter_author')
+        cls.reader = User.objects.create_user(username='counter_reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_views(self):
+        """Счётчики меняются при подписке, комментарии и удалениях"""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.reader_client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment = Comment.objects.get(post=self.post)
+        self.reader_client.get(reverse(
+            'posts:comment_delete',
+            kwargs={'comment_id': comment.pk, 'post_id': self.post.pk}
+        ))
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_drifted_counters_do_not_go_negative(self):
+        """Удаление при разошедшемся нулевом счётчике не падает"""
+        Comment.objects.bulk_create(
+            [Comment(author=self.reader, post=self.post, text='Мимо сигналов')]
+        )
+        comment = Comment.objects.get(post=self.post)
+        response = self.reader_client.get(reverse(
+            'posts:comment_delete',
+            kwargs={'comment_id': comment.pk, 'post_id': self.post.pk}
+        ))
+        self.assertEqual(response.status_code, 302)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        Follow.objects.bulk_create([Follow(user=self.reader,
+                                           author=self.author)])
+        Follow.objects.get(user=self.reader).delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_counters(self):
+        """reconcile_counters исправляет разошедшиеся счётчики"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.filter(user=self.author).update(
+            posts_count=7, followers_count=0
+        )
+        AuthorStats.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=self.post.pk).update(comments_count=3)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
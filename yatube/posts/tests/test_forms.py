@@ -1,3 +1,4 @@
+from hashlib import sha256
 from os.path import basename
 import shutil
 from tempfile import mkdtemp
@@ -102,8 +103,8 @@ class PostFormTest(TestCase):
             form_data['text']
         )
         self.assertEqual(
-            basename(new_post.image.file.name),
-            form_data['image'].name
+            basename(new_post.image.name),
+            sha256(test_gif).hexdigest() + '.gif'
         )
         group_response = self.authorized_author.get(
             reverse(
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from io import StringIO
+from tempfile import mkdtemp
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import (AuthorStats, Comment, Follow, Group, Post, Suggestion,
+                      TimelineEntry)
+
+User = get_user_model()
+USERS = [
+    {'id': 10, 'username': 'leo', 'first_name': 'Лев',
+     'last_name': 'Толстой'},
+    {'id': 11, 'username': 'existing'},
+    {'id': 12, 'username': 'reader'},
+]
+GROUPS = [{'id': 5, 'title': 'Классика', 'slug': 'classic'}]
+POSTS = [
+    {'id': 100 + number, 'author': 10, 'group': 5 if number % 2 else None,
+     'text': f'Пост {number}\nстрока',
+     'pub_date': f'2020-01-0{number + 1}T10:00:00+00:00'}
+    for number in range(5)
+] + [{'id': 200, 'author': 99, 'text': 'Автора нет'}]
+COMMENTS = [
+    {'id': 1, 'post': 104, 'author': 12, 'text': 'Первый',
+     'created': '2020-02-01T10:00:00+00:00'},
+    {'id': 2, 'post': 104, 'author': 11, 'text': 'Второй'},
+    {'id': 3, 'post': 101, 'author': 12, 'text': 'Третий'},
+]
+FOLLOWS = [{'user': 12, 'author': 10}, {'user': 10, 'author': 10}]
+
+
+class ImportTest(TestCase):
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.existing = User.objects.create_user(username='existing')
+        # Пост с занятым pk: импорт не должен на него наложиться.
+        Post.objects.create(author=self.existing, text='Старый пост')
+        self.write('users', USERS)
+        self.write('groups', GROUPS)
+        self.write('posts', POSTS)
+        self.write('follows', FOLLOWS)
+
+    def write(self, kind, records, tail=''):
+        with open(os.path.join(self.directory, f'{kind}.jsonl'), 'w',
+                  encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.write(tail)
+
+    def run_import(self):
+        out = StringIO()
+        call_command('import_yatube', self.directory, batch_size=2,
+                     chunk_size=2, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        """Импорт связывает записи и обновляет производные данные"""
+        self.write('comments', COMMENTS)
+        out = self.run_import()
+        self.assertIn('posts: строк 6, пропущено без связей 1', out)
+        leo = User.objects.get(username='leo')
+        reader = User.objects.get(username='reader')
+        self.assertEqual(User.objects.filter(username='existing').count(), 1)
+        posts = Post.objects.filter(author=leo)
+        self.assertEqual(posts.count(), 5)
+        self.assertEqual(posts.filter(group__slug='classic').count(), 2)
+        post = posts.get(text='Пост 4\nстрока')
+        self.assertEqual(post.pub_date,
+                         datetime(2020, 1, 5, 10, tzinfo=timezone.utc))
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertEqual(post.html, '<p>Пост 4<br>строка</p>')
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(
+            list(post.commented.order_by('created').values_list(
+                'author__username', flat=True
+            )),
+            ['reader', 'existing'],
+        )
+        stats = AuthorStats.objects.get(user=leo)
+        self.assertEqual((stats.posts_count, stats.followers_count), (5, 1))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 5)
+        self.assertTrue(Suggestion.objects.filter(value='leo').exists())
+        self.assertFalse(os.path.exists(os.path.join(
+            self.directory, 'import_yatube.checkpoint.json'
+        )))
+
+    def test_resume(self):
+        """После ошибки импорт продолжается без дублей"""
+        self.write('comments', COMMENTS[:2], tail='{битая строка\n')
+        with self.assertRaises(CommandError):
+            self.run_import()
+        self.assertEqual(Comment.objects.count(), 2)
+        self.write('comments', COMMENTS)
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(
+            sorted(Comment.objects.values_list('text', 'post__text')),
+            [('Второй', 'Пост 4\nстрока'), ('Первый', 'Пост 4\nстрока'),
+             ('Третий', 'Пост 1\nстрока')],
+        )
@@ -0,0 +1,114 @@
+import shutil
+from http import HTTPStatus
+from io import BytesIO
+from tempfile import mkdtemp
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..ingest import IMAGE_MAX_SIDE, ImageRejected, process
+from ..models import Post
+from ..templatetags.images import picture
+
+User = get_user_model()
+TEST_DIR = mkdtemp()
+ORIENTATION = 0x0112
+
+
+def encode(size, image_format='JPEG', orientation=None):
+    image = Image.new('RGB', size, (10, 120, 200))
+    buffer = BytesIO()
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[ORIENTATION] = orientation
+        options['exif'] = exif
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+class ProcessTest(SimpleTestCase):
+    def test_downscale_and_orientation(self):
+        """Картинка поворачивается по EXIF, уменьшается и теряет EXIF"""
+        data, width, height = process(
+            encode((IMAGE_MAX_SIDE + 440, 1000), orientation=6)
+        )
+        image = Image.open(BytesIO(data))
+        self.assertEqual(image.size, (width, height))
+        self.assertEqual(max(width, height), IMAGE_MAX_SIDE)
+        self.assertGreater(height, width)
+        self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_small_image_kept(self):
+        """Небольшая картинка без метаданных сохраняется как есть"""
+        data = encode((200, 100), 'PNG')
+        self.assertEqual(process(data), (data, 200, 100))
+
+    def test_decompression_bomb(self):
+        """Картинка с лишним числом пикселей отклоняется до декодирования"""
+        with self.assertRaises(ImageRejected):
+            process(encode((200, 100)), max_pixels=200 * 100 - 1)
+        with self.assertRaises(ImageRejected):
+            process(b'not an image')
+
+    def test_truncated_image(self):
+        """Обрезанный файл отклоняется, хотя заголовок читается"""
+        for image_format in ('JPEG', 'PNG'):
+            data = encode((IMAGE_MAX_SIDE + 440, 1000), image_format)
+            with self.subTest(image_format=image_format), \
+                    self.assertRaises(ImageRejected):
+                process(data[:len(data) // 2])
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class IngestFormTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='ingest_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_create_records_dimensions(self):
+        """Пост хранит уменьшенную копию и её размеры"""
+        upload = SimpleUploadedFile(
+            'big.jpg', encode((IMAGE_MAX_SIDE * 2, 500)), 'image/jpeg'
+        )
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Панорама', 'image': upload})
+        post = Post.objects.get(text='Панорама')
+        self.assertEqual((post.image_width, post.image_height),
+                         (IMAGE_MAX_SIDE, 250))
+        with post.image.open() as file:
+            self.assertEqual(Image.open(file).size, (IMAGE_MAX_SIDE, 250))
+
+    def test_truncated_upload_rejected(self):
+        """Обрезанная картинка — ошибка формы, а не 500"""
+        data = encode((IMAGE_MAX_SIDE * 2, 500))
+        upload = SimpleUploadedFile('cut.jpg', data[:len(data) // 2],
+                                    'image/jpeg')
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Обрезанная', 'image': upload})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.filter(text='Обрезанная').exists())
+
+    def test_srcset_from_dimensions(self):
+        """Ширины srcset берутся из размеров поста, без чтения файла"""
+        post = Post(author=self.author, image='posts/missing.png',
+                    image_width=400, image_height=300)
+        thumbnail = type('Thumbnail', (), {'url': '/t.png', 'width': 960,
+                                           'height': 339})
+        context = picture(post, thumbnail)
+        self.assertIn('320w', context['srcset'])
+        self.assertNotIn('640w', context['srcset'])
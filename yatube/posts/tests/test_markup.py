@@ -0,0 +1,84 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils.html import linebreaks
+
+from ..markup import render_text
+from ..models import Post
+
+User = get_user_model()
+TEXTS = (
+    'Одна строка',
+    'Первая\nвторая <b>&',
+    'Абзац\r\n\r\nи ещё\n\n\n   абзац',
+)
+
+
+class RenderTextTest(SimpleTestCase):
+    def test_plain_same_as_linebreaks(self):
+        """Без Markdown результат как у фильтра linebreaks"""
+        for text in TEXTS:
+            with self.subTest(text=text):
+                self.assertEqual(render_text(text),
+                                 linebreaks(text, autoescape=True))
+
+    @mock.patch('posts.markup.POST_MARKDOWN', True)
+    def test_markdown(self):
+        """Разметка Markdown внутри экранированного текста"""
+        cases = {
+            '**жирный** и *курсив*':
+                '<p><strong>жирный</strong> и <em>курсив</em></p>',
+            '`**не** <b>`': '<p><code>**не** &lt;b&gt;</code></p>',
+            '[сайт](https://example.com/a?b=1)':
+                '<p><a href="https://example.com/a?b=1" '
+                'rel="nofollow noopener">сайт</a></p>',
+            'раз\nдва\n\nтри': '<p>раз<br>два</p>\n\n<p>три</p>',
+        }
+        for text, html in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(render_text(text), html)
+
+    @mock.patch('posts.markup.POST_MARKDOWN', True)
+    def test_markdown_escapes(self):
+        """Теги и кавычки экранируются, ссылки только http и https"""
+        cases = {
+            '<script>alert(1)</script>':
+                '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>',
+            '[x](javascript:alert(1))': '<p>[x](javascript:alert(1))</p>',
+            '[x](https://a.ru/"onclick=")':
+                '<p><a href="https://a.ru/&quot;onclick=&quot;" '
+                'rel="nofollow noopener">x</a></p>',
+        }
+        for text, html in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(render_text(text), html)
+
+
+class PostHtmlTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='markup_author')
+
+    def test_html_on_save(self):
+        """HTML готовится при сохранении, updated меняется при правке"""
+        post = Post.objects.create(author=self.author, text='Было <i>')
+        self.assertEqual(post.html, '<p>Было &lt;i&gt;</p>')
+        updated = post.updated
+        post.text = 'Стало'
+        post.save(update_fields=('text',))
+        post.refresh_from_db()
+        self.assertEqual(post.html, '<p>Стало</p>')
+        self.assertGreater(post.updated, updated)
+
+    def test_rerender_posts(self):
+        """Команда готовит HTML заново после смены настройки"""
+        post = Post.objects.create(author=self.author, text='**жирный**')
+        out = StringIO()
+        with mock.patch('posts.markup.POST_MARKDOWN', True):
+            call_command('rerender_posts', stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.html, '<p><strong>жирный</strong></p>')
+        self.assertIn('Обновлено постов: 1', out.getvalue())
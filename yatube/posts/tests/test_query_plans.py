@@ -0,0 +1,79 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+Q_OF_POSTS = 25
+# Полный проход по таблице без индекса: «SCAN posts_post»,
+# но не «SCAN posts_post USING INDEX ...».
+FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING (COVERING )?INDEX)\b')
+
+
+class QueryPlanTest(TestCase):
+    """
+    Каждый SELECT горячих страниц прогоняется через EXPLAIN QUERY PLAN:
+    запросы должны идти по индексам, без полного прохода по таблице
+    и без временного B-дерева для сортировки.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='plan_author')
+        cls.reader = User.objects.create_user(username='plan_reader')
+        cls.group = Group.objects.create(title='Группа', slug='plan-group')
+        for number in range(Q_OF_POSTS):
+            post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text=f'Пост {number}')
+        cls.post = post
+        for number in range(Q_OF_POSTS):
+            Comment.objects.create(author=cls.reader, post=cls.post,
+                                   text=f'Комментарий {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def plans(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url, params)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' | '.join(row[-1] for row in cursor.fetchall())
+                plans.append((sql, plan))
+        return response, plans
+
+    def assert_indexed(self, url):
+        response, plans = self.plans(url)
+        page_obj = response.context.get('page_obj')
+        next_cursor = getattr(page_obj, 'next_cursor', '')
+        if next_cursor:
+            plans += self.plans(url, {'cursor': next_cursor})[1]
+        for sql, plan in plans:
+            with self.subTest(url=url, sql=sql):
+                self.assertIsNone(FULL_SCAN.search(plan), plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feed_query_plans(self):
+        """Ленты и страница поста читаются по индексам"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            self.assert_indexed(url)
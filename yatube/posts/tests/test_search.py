@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import SearchResults, filter_by_text, match_expression
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='search_author')
+        cls.admin = User.objects.create_superuser(
+            username='search_admin', email='a@a.ru', password='pass'
+        )
+        cls.strong = Post.objects.create(
+            author=cls.author, text='Жираф жираф жираф в зоопарке'
+        )
+        cls.weak = Post.objects.create(
+            author=cls.author,
+            text='Длинный рассказ о поездке, где однажды мелькнул жираф, '
+                 'а потом были горы, реки, поезда и много другого',
+        )
+        cls.commented = Post.objects.create(author=cls.author, text='Фото')
+        cls.comment = Comment.objects.create(
+            author=cls.author, post=cls.commented, text='Какой жираф!'
+        )
+        Post.objects.create(author=cls.author, text='Про слонов')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_match_expression(self):
+        """Слова экранируются, последнее ищется как префикс"""
+        self.assertEqual(match_expression('жир"аф OR зоо'),
+                         '"жир" "аф" "OR" "зоо"*')
+        self.assertEqual(match_expression('  ,. '), '')
+
+    def test_ranking(self):
+        """Поиск находит посты и комментарии, ранжируя по bm25"""
+        results = SearchResults('жираф')
+        self.assertEqual(results.count(), 3)
+        found = results[0:10]
+        self.assertEqual(found[0], self.strong)
+        self.assertEqual(set(found), {self.strong, self.weak, self.commented})
+
+    def test_prefix(self):
+        """Незаконченное последнее слово ищется как префикс"""
+        self.assertEqual(list(SearchResults('зоопа')[0:10]), [self.strong])
+
+    def test_triggers_follow_edits(self):
+        """Индекс следует за изменением и удалением текста"""
+        self.strong.text = 'Теперь про бегемота'
+        self.strong.save()
+        self.assertNotIn(self.strong, SearchResults('жираф')[0:10])
+        self.assertEqual(list(SearchResults('бегемот')[0:10]), [self.strong])
+        self.comment.delete()
+        self.assertNotIn(self.commented, SearchResults('жираф')[0:10])
+
+    def test_search_view(self):
+        """Страница поиска выводит найденные посты"""
+        response = self.client.get(reverse('posts:search'), {'q': 'слон'})
+        self.assertEqual(response.context['query'], 'слон')
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Про слонов'],
+        )
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по индексу, а не по LIKE"""
+        queryset = filter_by_text(Post.objects.all(), 'posts_post_fts',
+                                  'зоопарк')
+        self.assertIn('MATCH', str(queryset.query))
+        self.assertEqual(list(queryset), [self.strong])
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        response = admin_client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'жираф'}
+        )
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.comment])
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс по существующим данным"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO posts_post_fts (posts_post_fts) "
+                "VALUES ('delete-all')"
+            )
+        self.assertEqual(SearchResults('слон').count(), 0)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(SearchResults('слон').count(), 1)
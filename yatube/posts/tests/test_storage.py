@@ -0,0 +1,158 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import StringIO
+from tempfile import mkdtemp
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models.query import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..blobs import IMAGE_STORAGE, retain
+from ..models import ImageBlob, Post
+
+User = get_user_model()
+TEST_DIR = mkdtemp()
+CONTENT = b'GIF89a-not-really-an-image'
+DIGEST = sha256(CONTENT).hexdigest()
+NAME = f'posts/{DIGEST[:2]}/{DIGEST}.gif'
+
+
+def on_commit_now():
+    return mock.patch('posts.signals.transaction.on_commit',
+                      side_effect=lambda callback: callback())
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='blob_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def create(self, content=CONTENT, name='upload.GIF'):
+        post = Post(author=self.author, text='Картинка')
+        post.image.save(name, ContentFile(content), save=False)
+        post.save()
+        return post
+
+    def refs(self, name=NAME):
+        return ImageBlob.objects.get(name=name).refs
+
+    def test_same_content_stored_once(self):
+        """Одинаковые загрузки дают один файл с именем по хэшу"""
+        first, second = self.create(), self.create(name='other.gif')
+        self.assertEqual(first.image.name, NAME)
+        self.assertEqual(second.image.name, NAME)
+        self.assertEqual(self.refs(), 2)
+        self.assertTrue(IMAGE_STORAGE.exists(NAME))
+
+    def test_last_reference_deletes_file(self):
+        """Файл удаляется только вместе с последним постом"""
+        first, second = self.create(), self.create()
+        with on_commit_now():
+            first.delete()
+            self.assertTrue(IMAGE_STORAGE.exists(NAME))
+            second.delete()
+        self.assertFalse(IMAGE_STORAGE.exists(NAME))
+        self.assertFalse(ImageBlob.objects.filter(name=NAME).exists())
+
+    def test_replace_releases_previous(self):
+        """Замена картинки снимает ссылку со старого файла"""
+        post = self.create()
+        with on_commit_now():
+            post.image.save('new.gif', ContentFile(b'other content'))
+        self.assertFalse(IMAGE_STORAGE.exists(NAME))
+        self.assertEqual(self.refs(post.image.name), 1)
+        with on_commit_now():
+            post.image.save('again.gif', ContentFile(b'other content'))
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_retain_after_concurrent_create(self):
+        """Запись, созданная между update и create, получает ссылку"""
+        ImageBlob.objects.create(name=NAME, refs=1)
+        real_update = QuerySet.update
+        calls = []
+
+        def late_update(queryset, **kwargs):
+            # Первый update не видит запись: её ещё не закоммитила
+            # параллельная загрузка, и create упирается в unique.
+            calls.append(kwargs)
+            if len(calls) == 1:
+                return 0
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', late_update):
+            retain(NAME)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.refs(), 2)
+
+    def test_failed_save_takes_no_reference(self):
+        """Пост, не сохранённый после записи файла, не оставляет ссылки"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            post = Post(author=self.author, text=None)
+            post.image.save('upload.gif', ContentFile(CONTENT))
+        self.assertFalse(ImageBlob.objects.filter(name=NAME).exists())
+        Post.objects.create(author=self.author, text='По имени', image=NAME)
+        self.assertEqual(self.refs(), 1)
+        post.text = 'Со второй попытки'
+        post.save()
+        self.assertEqual(self.refs(), 2)
+
+    def test_claim_rewrites_released_file(self):
+        """Файл, удалённый между записью и ссылкой, пишется заново"""
+        post = Post(author=self.author, text='Картинка')
+        post.image.save('upload.gif', ContentFile(CONTENT), save=False)
+        IMAGE_STORAGE.delete(NAME)
+        post.save()
+        self.assertEqual(self.refs(), 1)
+        with IMAGE_STORAGE.open(NAME) as file:
+            self.assertEqual(file.read(), CONTENT)
+
+    def test_reconcile(self):
+        """Команда чинит счётчики и удаляет файлы без ссылок"""
+        post = self.create()
+        Post.objects.filter(pk=post.pk).update(image='')
+        Post.objects.create(author=self.author, text='Старый',
+                            image='posts/legacy.gif')
+        self.assertEqual(self.refs('posts/legacy.gif'), 1)
+        ImageBlob.objects.filter(name='posts/legacy.gif').update(refs=5)
+        out = StringIO()
+        call_command('reconcile_images', stdout=out)
+        self.assertIn('Удалено файлов: 1', out.getvalue())
+        self.assertFalse(IMAGE_STORAGE.exists(NAME))
+        self.assertEqual(self.refs('posts/legacy.gif'), 1)
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class ConcurrentUploadTest(SimpleTestCase):
+    def test_concurrent_identical_uploads(self):
+        """Параллельная запись одного содержимого даёт один целый файл"""
+        # save не обращается к БД: ссылки добавляет сигнал поста,
+        # а конфликт вставки ImageBlob проверяет
+        # test_retain_after_concurrent_create.
+        start = threading.Barrier(8)
+
+        def upload(number):
+            start.wait()
+            return IMAGE_STORAGE.save(f'posts/{number}.gif',
+                                      ContentFile(CONTENT))
+
+        with ThreadPoolExecutor(8) as executor:
+            names = set(executor.map(upload, range(8)))
+        self.assertEqual(names, {NAME})
+        with IMAGE_STORAGE.open(NAME) as file:
+            self.assertEqual(file.read(), CONTENT)
+        directory = os.path.dirname(IMAGE_STORAGE.path(NAME))
+        self.assertEqual(os.listdir(directory), [os.path.basename(NAME)])
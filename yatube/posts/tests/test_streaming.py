@@ -0,0 +1,106 @@
+import gzip
+import shutil
+from tempfile import mkdtemp
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, modify_settings, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Group, Post
+from .test_thumbnails import make_image
+
+User = get_user_model()
+TEST_DIR = mkdtemp()
+POSTS = 12
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class StreamingRenderTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='streamer',
+                                              first_name='Поток')
+        cls.group = Group.objects.create(title='Поток', slug='stream',
+                                         description='Лента по частям')
+        posts = [Post.objects.create(author=cls.author, group=cls.group,
+                                     text=f'Пост <{i}> & текст')
+                 for i in range(POSTS)]
+        posts[-1].image = make_image('stream.png')
+        posts[-1].save()
+        thumbnails.generate(posts[-1].image.name)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def buffered(self, url):
+        cache.clear()
+        response = self.client.get(url)
+        self.assertFalse(response.streaming)
+        return response
+
+    def streamed(self, url, **headers):
+        cache.clear()
+        with mock.patch('posts.streaming.STREAMING_RENDER', True):
+            response = self.client.get(url, **headers)
+        self.assertTrue(response.streaming)
+        return response, list(response.streaming_content)
+
+    def test_output_matches_buffered_render(self):
+        """Склеенный поток совпадает с обычным render()"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                expected = self.buffered(url)
+                response, chunks = self.streamed(url)
+                self.assertEqual(b''.join(chunks), expected.content)
+                self.assertEqual(response['Content-Type'],
+                                 expected['Content-Type'])
+                self.assertEqual(response.query_report.total,
+                                 expected.query_report.total)
+
+    def test_header_before_cards(self):
+        """Шапка уходит первым фрагментом, затем по карточке"""
+        response, chunks = self.streamed(reverse('posts:index'))
+        self.assertIn(b'<header>', chunks[0])
+        self.assertNotIn(b'<article>', chunks[0])
+        cards = [chunk for chunk in chunks if chunk.count(b'<article>')]
+        self.assertEqual(len(cards), 10)
+        self.assertTrue(all(chunk.count(b'<article>') == 1
+                            for chunk in cards))
+        self.assertIn(b'<picture>', cards[0])
+
+    def test_cached_fragment(self):
+        """Повторный запрос отдаёт фрагмент из кэша тем же текстом"""
+        url = reverse('posts:profile', args=(self.author.username,))
+        _, first = self.streamed(url)
+        with mock.patch('posts.streaming.STREAMING_RENDER', True):
+            response = self.client.get(url)
+            second = list(response.streaming_content)
+        self.assertEqual(b''.join(first), b''.join(second))
+        self.assertLess(len(second), len(first))
+
+    @modify_settings(MIDDLEWARE={
+        'prepend': 'django.middleware.gzip.GZipMiddleware',
+    })
+    def test_gzip_middleware(self):
+        """GZipMiddleware сжимает поток без изменения содержимого"""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        expected = self.buffered(url)
+        response, chunks = self.streamed(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(chunks)), expected.content)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Suggestion
+from ..suggestions import AUTOCOMPLETE_LIMIT, normalize, rebuild, suggest
+
+User = get_user_model()
+
+
+class SuggestionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='petrov', first_name='Фёдор', last_name='Петров'
+        )
+        cls.group = Group.objects.create(
+            title='Клуб любителей котов', slug='cats'
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def labels(self, prefix, **kwargs):
+        return [item['label'] for item in suggest(prefix, **kwargs)]
+
+    def test_normalize(self):
+        """Ключ без регистра, с е вместо ё и схлопнутыми пробелами"""
+        self.assertEqual(normalize('  Фёдор   ПЕТРОВ '), 'федор петров')
+
+    def test_prefixes(self):
+        """Находятся логин, имя, фамилия и слова названия группы"""
+        label = 'Фёдор Петров (petrov)'
+        self.assertEqual(self.labels('pet'), [label])
+        self.assertEqual(self.labels('Федо'), [label])
+        self.assertEqual(self.labels('петр'), [label])
+        self.assertEqual(self.labels('котов'), [self.group.title])
+        self.assertEqual(self.labels('любителей к'), [self.group.title])
+        self.assertEqual(self.labels('ca'), [self.group.title])
+        self.assertEqual(self.labels('xyz'), [])
+        self.assertEqual(self.labels(''), [])
+
+    def test_signals_follow_changes(self):
+        """Подсказки обновляются при переименовании и удалении"""
+        self.user.last_name = 'Сидоров'
+        self.user.save()
+        self.assertEqual(self.labels('петр'), [])
+        self.assertEqual(self.labels('сид'), ['Фёдор Сидоров (petrov)'])
+        self.group.delete()
+        self.assertEqual(self.labels('котов'), [])
+        self.assertFalse(Suggestion.objects.filter(kind='group').exists())
+
+    def test_limit(self):
+        """Ответ ограничен AUTOCOMPLETE_LIMIT объектами без повторов"""
+        for number in range(AUTOCOMPLETE_LIMIT + 5):
+            User.objects.create_user(username=f'user{number}',
+                                     first_name='User')
+        results = suggest('user', limit=100)
+        self.assertEqual(len(results), AUTOCOMPLETE_LIMIT)
+        self.assertEqual(len({item['value'] for item in results}),
+                         AUTOCOMPLETE_LIMIT)
+        self.assertEqual(len(suggest('user', limit=3)), 3)
+
+    def test_many_keys_per_object(self):
+        """Объекты с множеством ключей дают limit разных ответов за запрос"""
+        for number in range(AUTOCOMPLETE_LIMIT):
+            Group.objects.create(title=' '.join(['кот'] * 20),
+                                 slug=f'kot{number}')
+        Group.objects.create(title='котик', slug='kotik')
+        with self.assertNumQueries(1):
+            results = suggest('кот', limit=3)
+        self.assertEqual([item['value'] for item in results],
+                         ['kot0', 'kot1', 'kot2'])
+        values = [item['value'] for item in suggest('коти')]
+        self.assertEqual(values, ['kotik'])
+        with self.assertNumQueries(1):
+            results = suggest('кот')
+        self.assertEqual(len({item['value'] for item in results}),
+                         AUTOCOMPLETE_LIMIT)
+
+    def test_view(self):
+        """Эндпоинт отдаёт JSON одним запросом по диапазону индекса"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:autocomplete'),
+                                       {'q': 'Пет', 'limit': 'x'})
+        self.assertEqual(response.json(), {'results': [{
+            'type': 'user',
+            'label': 'Фёдор Петров (petrov)',
+            'value': 'petrov',
+            'url': reverse('posts:profile', args=('petrov',)),
+        }]})
+        self.assertEqual(len(queries), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {queries[0]["sql"]}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('suggestion_key_idx (key>? AND key<?)', plan)
+
+    def test_rebuild(self):
+        """rebuild восстанавливает подсказки после bulk-операций"""
+        Suggestion.objects.all().delete()
+        User.objects.filter(pk=self.user.pk).update(username='ivanov')
+        rebuild()
+        self.assertEqual(self.labels('iva'), ['Фёдор Петров (ivanov)'])
@@ -0,0 +1,235 @@
+import shutil
+from io import BytesIO, StringIO
+from tempfile import mkdtemp
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails, variants
+from ..models import Post
+
+User = get_user_model()
+TEST_DIR = mkdtemp()
+PLACEHOLDER = 'aspect-ratio: 960 / 339'
+
+
+def make_image(name='photo.png'):
+    # Цвет из имени: хранилище по содержимому склеивает одинаковые файлы.
+    color = tuple(sum(map(ord, name)) * k % 256 for k in (1, 3, 7))
+    buffer = BytesIO()
+    Image.new('RGB', (120, 60), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='thumb_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_placeholder_until_ready(self):
+        """Без готовой миниатюры выводится заглушка, генерация в очереди"""
+        post = Post.objects.create(author=self.author, text='Фото',
+                                   image=make_image())
+        url = reverse('posts:post_detail', args=(post.pk,))
+        with mock.patch('posts.thumbnails.transaction.on_commit') as queued:
+            response = self.client.get(url)
+        self.assertContains(response, PLACEHOLDER)
+        self.assertNotContains(response, '<img class="card-img')
+        queued.assert_called_once()
+        thumbnails.generate(post.image.name)
+        response = self.client.get(url)
+        self.assertNotContains(response, PLACEHOLDER)
+        self.assertContains(response, '<img class="card-img')
+
+    def test_placeholder_card_not_cached(self):
+        """Карточка с заглушкой не кэшируется, с миниатюрой — да"""
+        post = Post.objects.create(author=self.author, text='Фото',
+                                   image=make_image('card.png'))
+        card = Template('{% load cards %}{% post_card post %}')
+        with mock.patch('posts.thumbnails.transaction.on_commit'):
+            html = card.render(Context({'post': post}))
+        self.assertIn(PLACEHOLDER, html)
+        self.assertFalse(thumbnails.is_ready(post))
+        thumbnails.generate(post.image.name)
+        self.assertTrue(thumbnails.is_ready(post))
+        html = card.render(Context({'post': post}))
+        self.assertNotIn(PLACEHOLDER, html)
+        with mock.patch('posts.templatetags.cards.thumbnails') as ready:
+            self.assertEqual(card.render(Context({'post': post})), html)
+        ready.is_ready.assert_not_called()
+
+    def test_responsive_variants(self):
+        """Варианты по ширинам в WebP и PNG, страница выводит srcset"""
+        post = Post.objects.create(author=self.author, text='Фото',
+                                   image=make_image())
+        thumbnails.generate(post.image.name)
+        for width in variants.IMAGE_VARIANT_WIDTHS:
+            for image_format in ('WEBP', 'PNG'):
+                name = variants.variant_name(post.image.name, width,
+                                             image_format)
+                with self.subTest(name=name):
+                    with thumbnails.IMAGE_STORAGE.open(name) as file:
+                        image = Image.open(file)
+                        self.assertEqual(image.format, image_format)
+                        self.assertEqual(
+                            image.size, (width, variants.variant_height(width))
+                        )
+        self.assertEqual(variants.generate(post.image.name, None,
+                                           thumbnails.IMAGE_STORAGE), 0)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        webp = variants.variant_name(post.image.name, 320, 'WEBP')
+        self.assertContains(response, f'/media/{webp} 320w')
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="960" height="339"')
+
+    def test_no_placeholder_without_image(self):
+        """Пост без картинки не получает заглушку"""
+        post = Post.objects.create(author=self.author, text='Текст')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertNotContains(response, PLACEHOLDER)
+
+    def test_create_schedules_generation(self):
+        """post_create отдаёт картинку в фоновый пул, а не в шаблон"""
+        with mock.patch('posts.thumbnails.transaction.on_commit',
+                        side_effect=lambda callback: callback()), \
+                mock.patch('posts.thumbnails._submit') as submit:
+            self.client.post(reverse('posts:post_create'),
+                             {'text': 'С фото', 'image': make_image()})
+        post = Post.objects.get(text='С фото')
+        submit.assert_called_once_with(post.image.name)
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class PrefetchThumbnailsTest(TestCase):
+    LOOP = ('{% for post in posts %}'
+            '{% include "posts/includes/post_form.html" '
+            'with author=post.author %}{% endfor %}')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='prefetch_author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Фото {number}',
+                                image=make_image(f'page{number}.png'))
+            for number in range(10)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def kvstore_queries(self, source):
+        with mock.patch('posts.thumbnails.schedule'), \
+                CaptureQueriesContext(connection) as queries:
+            html = Template(source).render(Context({'posts': self.posts}))
+        return html, [query for query in queries.captured_queries
+                      if 'thumbnail_kvstore' in query['sql']]
+
+    def test_single_lookup_per_page(self):
+        """Метаданные миниатюр страницы читаются одним запросом"""
+        _, queries = self.kvstore_queries(self.LOOP)
+        self.assertEqual(len(queries), len(self.posts))
+        cache.clear()
+        _, queries = self.kvstore_queries(
+            '{% load images %}{% prefetch_thumbnails posts %}'
+            + self.LOOP + '{% endprefetch_thumbnails %}'
+        )
+        self.assertEqual(len(queries), 1)
+        _, queries = self.kvstore_queries(
+            '{% load images %}{% prefetch_thumbnails posts %}'
+            + self.LOOP + '{% endprefetch_thumbnails %}'
+        )
+        self.assertEqual(len(queries), 0)
+
+    def test_prefetch_sees_ready_thumbnails(self):
+        """Готовые миниатюры выводятся, остальные — заглушкой"""
+        thumbnails.generate(self.posts[0].image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'), {'page': 1})
+        self.assertEqual(
+            len([query for query in queries.captured_queries
+                 if 'thumbnail_kvstore' in query['sql']]), 1
+        )
+        self.assertContains(response, '<img class="card-img', count=1)
+        self.assertContains(response, PLACEHOLDER, count=9)
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class BackfillThumbnailsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='backfill_author')
+        self.posts = [
+            Post.objects.create(author=author, text=f'Фото {number}',
+                                image=make_image(f'photo{number}.png'))
+            for number in range(3)
+        ]
+
+    def test_backfill(self):
+        """Команда создаёт миниатюры всех картинок пулом потоков"""
+        out = StringIO()
+        # Тестовая SQLite в памяти не ждёт блокировку, а сразу отвечает
+        # «table is locked»: пул из одного потока, но в отдельном потоке.
+        call_command('backfill_thumbnails', workers=1, stdout=out)
+        self.assertIn('Обработано картинок: 3, ошибок: 0', out.getvalue())
+        backend = thumbnails.PendingThumbnailBackend()
+        for post in self.posts:
+            for geometry, options in thumbnails.THUMBNAIL_GEOMETRIES:
+                with self.subTest(post=post.pk, geometry=geometry):
+                    with mock.patch('posts.thumbnails.schedule') as queued:
+                        thumbnail = backend.get_thumbnail(
+                            post.image, geometry, **options
+                        )
+                    queued.assert_not_called()
+                    self.assertTrue(default.storage.exists(thumbnail.name))
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR)
+class WaitThumbnailsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='wait_author')
+        self.post = Post.objects.create(author=author, text='Фото',
+                                        image=make_image('wait.png'))
+
+    def test_ready_after_request(self):
+        """При THUMBNAIL_WAIT запрос заканчивается после работы пула"""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with override_settings(THUMBNAIL_WAIT=True):
+            self.assertContains(self.client.get(url), PLACEHOLDER)
+        self.assertTrue(thumbnails.is_ready(self.post))
+        self.assertNotContains(self.client.get(url), PLACEHOLDER)
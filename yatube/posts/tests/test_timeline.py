@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Follow, Post, TimelineEntry
+from ..timeline import HybridFeedPaginator, fill
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='timeline_author')
+        cls.follower = User.objects.create_user(username='timeline_reader')
+        cls.old_post = Post.objects.create(author=cls.author,
+                                           text='Пост до подписки')
+
+    def entries(self):
+        return set(TimelineEntry.objects.filter(
+            user=self.follower
+        ).values_list('post_id', flat=True))
+
+    def test_fan_out(self):
+        """Подписка, новый пост и отписка меняют материализованную ленту"""
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.entries(), {self.old_post.pk})
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.entries(), {self.old_post.pk, new_post.pk})
+        follow.delete()
+        self.assertEqual(self.entries(), set())
+
+    def test_repair(self):
+        """repair_timeline удаляет лишние и досоздаёт недостающие записи"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        TimelineEntry.objects.all().delete()
+        stranger = User.objects.create_user(username='timeline_stranger')
+        stray = Post.objects.create(author=stranger, text='Чужой пост')
+        TimelineEntry.objects.create(user=self.follower, post=stray,
+                                     pub_date=stray.pub_date)
+        call_command('repair_timeline', stdout=StringIO())
+        self.assertEqual(self.entries(), {self.old_post.pk})
+
+    @override_settings(FEED_PULL_THRESHOLD=1)
+    def test_threshold_crossing(self):
+        """
+        Автор, перешедший порог подписчиков вниз, раскладывается
+        по лентам заново, а вверх — убирается из них
+        """
+        fan = User.objects.create_user(username='timeline_crossing_fan')
+        Follow.objects.create(user=self.follower, author=self.author)
+        extra = Follow.objects.create(user=fan, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        post = Post.objects.create(author=self.author, text='Пост над порогом')
+        extra.delete()
+        self.assertEqual(self.entries(), {self.old_post.pk, post.pk})
+        feed = HybridFeedPaginator(
+            self.follower, Post.objects.all(), 10
+        ).cursor_page(None)
+        self.assertEqual(list(feed), [post, self.old_post])
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        feed = HybridFeedPaginator(
+            self.follower, Post.objects.all(), 10
+        ).cursor_page(None)
+        self.assertEqual(list(feed), [post, self.old_post])
+
+    @override_settings(FEED_PULL_THRESHOLD=1)
+    def test_fill(self):
+        """fill раскладывает посты, как add_author, кроме популярных"""
+        star = User.objects.create_user(username='timeline_fill_star')
+        fan = User.objects.create_user(username='timeline_fill_fan')
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.follower, author=star)
+        Follow.objects.create(user=fan, author=star)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=star, text='Пост популярного автора')
+        TimelineEntry.objects.all().delete()
+        self.assertEqual(fill(Follow.objects.all(), pk__gte=new_post.pk), 1)
+        self.assertEqual(self.entries(), {new_post.pk})
+        fill(Follow.objects.filter(user=self.follower))
+        self.assertEqual(self.entries(), {self.old_post.pk, new_post.pk})
+        self.assertEqual(
+            TimelineEntry.objects.get(post=new_post).pub_date,
+            new_post.pub_date,
+        )
+
+    @override_settings(FEED_PULL_THRESHOLD=1)
+    def test_hybrid_feed(self):
+        """
+        Посты популярного автора не раскладываются по лентам,
+        а подмешиваются при чтении в общем порядке
+        """
+        star = User.objects.create_user(username='timeline_star')
+        fan = User.objects.create_user(username='timeline_fan')
+        Follow.objects.create(user=fan, author=star)
+        Follow.objects.create(user=self.follower, author=star)
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [self.old_post]
+        for number in range(4):
+            author = star if number % 2 else self.author
+            posts.append(Post.objects.create(author=author,
+                                             text=f'Пост {number}'))
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=star).exists()
+        )
+        expected = posts[::-1]
+        paginator = HybridFeedPaginator(self.follower, Post.objects.all(), 2)
+        first = paginator.cursor_page(None)
+        second = paginator.cursor_page(first.next_cursor)
+        third = paginator.cursor_page(second.next_cursor)
+        self.assertEqual(list(first) + list(second) + list(third), expected)
+        self.assertEqual(third.next_cursor, '')
+        back = paginator.cursor_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
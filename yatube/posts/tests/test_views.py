@@ -1,15 +1,20 @@
 import shutil
+from http import HTTPStatus
 from tempfile import mkdtemp
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
 from ..forms import PostForm
+from ..generations import GLOBAL_SCOPE, get_generation, group_scope
 from ..models import Group, Post, Comment, Follow
 
 User = get_user_model()
@@ -270,7 +275,10 @@ class TestPostViews(TestCase):
         self.assertEqual(follow_count, follow_count2)
 
     def test_cash(self):
-        """Проверка работы кэша главной страницы"""
+        """
+        Проверка работы кэша главной страницы: фрагмент не перерисовывается
+        без сигналов модели и устаревает сразу после удаления поста
+        """
         new_post = {'text': 'Проверка кэша', }
         self.authorized_author.post(
             reverse('posts:post_create'),
@@ -279,14 +287,131 @@ class TestPostViews(TestCase):
         post2 = Post.objects.first()
         response1 = self.client.get(reverse('posts:index'))
         response_1 = response1.content
-        post2.delete()
+        Post.objects.filter(pk=post2.pk).update(text='Тихая правка')
         response2 = self.client.get(reverse('posts:index'))
         response_2 = response2.content
         self.assertEqual(response_1, response_2)
-        cache.clear()
+        post2.delete()
         response3 = self.client.get(reverse('posts:index'))
         response_3 = response3.content
         self.assertNotEqual(response_1, response_3)
+        self.assertNotContains(response3, 'Проверка кэша')
+
+    def test_feed_cache_scopes(self):
+        """
+        Новый пост сбрасывает кэш своей группы и автора,
+        но не чужой группы
+        """
+        group2 = Group.objects.create(title='Другая группа', slug='other')
+        urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for url in urls:
+            self.client.get(url)
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Свежий пост')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+        other = get_generation(group_scope(group2.pk))
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Ещё пост')
+        self.assertEqual(get_generation(group_scope(group2.pk)), other)
+
+    def test_author_rename(self):
+        """
+        Смена имени автора сбрасывает кэш и ETag лент с его постами,
+        а вход пользователя — нет
+        """
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        generation = get_generation(GLOBAL_SCOPE)
+        self.client.force_login(self.author)
+        self.client.logout()
+        self.assertEqual(get_generation(GLOBAL_SCOPE), generation)
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'renamed_user'
+        author.first_name = 'Переименованный'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Переименованный Тестовый')
+                self.assertContains(
+                    response, reverse('posts:profile', args=('renamed_user',))
+                )
+
+    def test_conditional_get(self):
+        """
+        Страницы отдают ETag и 304 на If-None-Match до рендеринга;
+        новые данные и другой пользователь дают другой ETag
+        """
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(cached.content, b'')
+                other = self.authorized_author.get(url)['ETag']
+                self.assertNotEqual(other, etag)
+        post_url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.client.get(post_url)['ETag']
+        Comment.objects.create(text='Новый комментарий', author=self.author,
+                               post=self.post)
+        fresh = self.client.get(post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, HTTPStatus.OK)
+        profile_url = reverse('posts:profile', args=(self.author.username,))
+        etag = self.authorized_not_follower.get(profile_url)['ETag']
+        Follow.objects.create(user=self.not_follower, author=self.author)
+        fresh = self.authorized_not_follower.get(
+            profile_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(fresh.status_code, HTTPStatus.OK)
+
+    def test_post_etag_after_relogin(self):
+        """
+        После повторного входа токен CSRF новый: страница поста
+        с формой комментария отдаётся заново, а не 304
+        """
+        User.objects.create_user(username='relogin', password='secret-pass')
+        credentials = {'username': 'relogin', 'password': 'secret-pass'}
+        post_url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.post(reverse('users:login'), credentials)
+        etag = self.client.get(post_url)['ETag']
+        cached = self.client.get(post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+        self.client.get(reverse('users:logout'))
+        self.client.post(reverse('users:login'), credentials)
+        fresh = self.client.get(post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, HTTPStatus.OK)
+        self.assertContains(fresh, 'csrfmiddlewaretoken')
+
+    def test_post_etag_after_rename(self):
+        """Смена имени автора или названия группы меняет ETag поста"""
+        post_url = reverse('posts:post_detail', args=(self.post.pk,))
+        renames = (
+            (self.author, 'first_name', 'Новоимённый'),
+            (self.group, 'title', 'Новая группа'),
+        )
+        for obj, field, value in renames:
+            with self.subTest(field=field):
+                etag = self.client.get(post_url)['ETag']
+                setattr(obj, field, value)
+                obj.save()
+                fresh = self.client.get(post_url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(fresh.status_code, HTTPStatus.OK)
+                self.assertContains(fresh, value)
 
 
 class PaginatorViewTest(TestCase):
@@ -340,3 +465,120 @@ class PaginatorViewTest(TestCase):
                             len(response.context['page_obj']),
                             posts
                         )
+
+    def test_cursor_pages(self):
+        """
+        Проверка keyset-пагинации: переход по курсорам вперёд и назад,
+        битый курсор отдаёт первую страницу
+        """
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        self.assertEqual(len(first), POSTS_LMT)
+        self.assertEqual(first.previous_cursor, '')
+        second = self.client.get(
+            reverse('posts:index'), {'cursor': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second), PAGE_LEFTOVERS)
+        self.assertEqual(second.next_cursor, '')
+        self.assertTrue(set(first).isdisjoint(second))
+        back = self.client.get(
+            reverse('posts:index'), {'cursor': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        broken = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        ).context['page_obj']
+        self.assertEqual(list(broken), list(first))
+
+    def test_cursor_page_without_count(self):
+        """Страница по курсору не выполняет COUNT(*) и OFFSET"""
+        first = self.client.get(
+            reverse('posts:group_list', args=(self.group.slug,))
+        ).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:group_list', args=(self.group.slug,)),
+                {'cursor': first.next_cursor}
+            )
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_page_count_cached(self):
+        """
+        COUNT(*) для ?page=N берётся из кэша
+        и сбрасывается при создании поста
+        """
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.client.get(url, {'page': 2})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'page': 2})
+        self.assertFalse(any('COUNT(' in query['sql']
+                             for query in queries.captured_queries))
+        Post.objects.create(text='Новый', group=self.group,
+                            author=self.author)
+        page_obj = self.client.get(url, {'page': 2}).context['page_obj']
+        self.assertEqual(page_obj.paginator.count, Q_OF_POSTS + 1)
+        self.assertFalse(page_obj.paginator.count_is_estimate)
+
+    def test_page_count_estimate(self):
+        """Для большой таблицы количество оценивается по sqlite_stat1"""
+        cache.clear()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with mock.patch('posts.utils.COUNT_ESTIMATE_THRESHOLD', 0):
+            response = self.client.get(reverse('posts:index'), {'page': 1})
+        paginator = response.context['page_obj'].paginator
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertEqual(paginator.count, Q_OF_POSTS)
+        self.assertContains(response, 'около')
+
+
+class CommentLoaderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='comment_author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(author=cls.author, post=cls.post, text=f'Комм {number}')
+            for number in range(Q_OF_POSTS)
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_load_more_partial(self):
+        """
+        Частичный шаблон отдаёт следующую страницу комментариев
+        без обвязки страницы и без дублей
+        """
+        page = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        first = page.context['comments']
+        self.assertEqual(len(first), POSTS_LMT)
+        self.assertContains(page, 'data-partial')
+        partial = self.client.get(
+            reverse('posts:comments', args=(self.post.pk,)),
+            {'cursor': first.next_cursor}
+        )
+        self.assertTemplateUsed(partial, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(partial, 'base.html')
+        second = partial.context['comments']
+        self.assertEqual(len(second), PAGE_LEFTOVERS)
+        self.assertTrue(set(first).isdisjoint(second))
+        self.assertNotContains(partial, 'Показать ещё')
+
+    def test_comment_queries_do_not_grow(self):
+        """Число запросов не зависит от количества комментариев"""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        cache.clear()
+        Comment.objects.bulk_create(
+            Comment(author=User.objects.create_user(username=f'c{number}'),
+                    post=self.post, text='Ещё')
+            for number in range(Q_OF_POSTS)
+        )
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before), len(after))
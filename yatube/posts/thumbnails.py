@@ -0,0 +1,199 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import variants
+from .generations import bump_generations, post_scope, post_scopes
+from .models import Post
+
+logger = logging.getLogger(__name__)
+THUMBNAIL_GEOMETRIES = settings.THUMBNAIL_GEOMETRIES
+THUMBNAIL_WORKERS = settings.THUMBNAIL_WORKERS
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+_executor = None
+_pending = set()
+_futures = set()
+_lock = threading.Lock()
+_prefetched = threading.local()
+
+
+def generate(name):
+    """
+    Создаёт адаптивные варианты и миниатюры файла во всех геометриях
+    THUMBNAIL_GEOMETRIES и сбрасывает кэш фрагментов, где вместо
+    картинки была заглушка. Варианты создаются первыми: готовая
+    миниатюра в шаблоне означает, что есть и они.
+    """
+    backend = ThumbnailBackend()
+    # Ключ sorl зависит от класса хранилища: как у post.image в шаблоне.
+    source = ImageFile(name, IMAGE_STORAGE)
+    try:
+        posts = list(Post.objects.filter(image=name).values_list(
+            'pk', 'group_id', 'author_id', 'image_width'
+        ))
+        variants.generate(name, posts[0][3] if posts else None,
+                          IMAGE_STORAGE)
+        for geometry, options in THUMBNAIL_GEOMETRIES:
+            backend.get_thumbnail(source, geometry, **options)
+        for pk, group_id, author_id, _ in posts:
+            bump_generations(post_scope(pk), *post_scopes(group_id, author_id))
+    finally:
+        with _lock:
+            _pending.discard(name)
+        # Соединения с БД у потока свои, закрываем их сами.
+        connections.close_all()
+
+
+def _submit(name):
+    global _executor
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+    future = _executor.submit(generate, name)
+    with _lock:
+        _futures.add(future)
+    future.add_done_callback(_forget)
+    future.add_done_callback(_log_failure)
+
+
+def _forget(future):
+    with _lock:
+        _futures.discard(future)
+
+
+def wait():
+    """Ждёт, пока пул обработает все уже поставленные файлы."""
+    with _lock:
+        futures = list(_futures)
+    wait_futures(futures)
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error('Не удалось создать миниатюры',
+                     exc_info=future.exception())
+
+
+def schedule(image):
+    """
+    Ставит файл в очередь фонового пула после коммита транзакции,
+    чтобы воркер видел сохранённый файл и запись о нём.
+    """
+    if image:
+        name = getattr(image, 'name', image)
+        transaction.on_commit(lambda: _submit(name))
+
+
+class PendingThumbnailBackend(ThumbnailBackend):
+    """
+    Бэкенд для шаблонов: отдаёт только готовые миниатюры, а отсутствующую
+    ставит в очередь и возвращает None — тег выводит блок {% empty %}.
+    Картинка никогда не декодируется в запросе.
+    """
+
+    def thumbnail_file(self, file_, geometry_string, options):
+        """Файл миниатюры с теми же именем и ключом, что у sorl."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        cached = default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, options)
+        )
+        if cached is None:
+            schedule(file_)
+        return cached
+
+
+class PrefetchKVStore(cached_db_kvstore.KVStore):
+    """
+    KVStore sorl, который сначала смотрит в значения, загруженные
+    prefetch для текущей отрисовки: одна страница ленты стоит одного
+    get_many к кэшу и не больше одного запроса к таблице kvstore.
+    """
+
+    def prefetch(self, keys):
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            fill = {key: stored.get(key, cached_db_kvstore.EMPTY_VALUE)
+                    for key in missing}
+            self.cache.set_many(fill, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(fill)
+        return found
+
+    def _get_raw(self, key):
+        values = getattr(_prefetched, 'values', None)
+        if values is None or key not in values:
+            return super()._get_raw(key)
+        value = values[key]
+        return None if value == cached_db_kvstore.EMPTY_VALUE else value
+
+
+def is_ready(post):
+    """Готовы ли миниатюры картинки поста; без картинки — да."""
+    if not post.image:
+        return True
+    backend = PendingThumbnailBackend()
+    return all(
+        default.kvstore.get(backend.thumbnail_file(post.image, geometry,
+                                                   dict(options)))
+        is not None
+        for geometry, options in THUMBNAIL_GEOMETRIES
+    )
+
+
+def page_keys(posts):
+    backend = PendingThumbnailBackend()
+    return [
+        add_prefix(backend.thumbnail_file(post.image, geometry,
+                                          dict(options)).key)
+        for post in posts if post.image
+        for geometry, options in THUMBNAIL_GEOMETRIES
+    ]
+
+
+@contextmanager
+def prefetched(posts):
+    """
+    Метаданные миниатюр всех постов страницы загружаются разом
+    и забываются по выходе, чтобы не пережить отрисовку.
+    """
+    keys = page_keys(posts)
+    if keys and isinstance(default.kvstore, PrefetchKVStore):
+        _prefetched.values = default.kvstore.prefetch(keys)
+    try:
+        yield
+    finally:
+        _prefetched.values = None
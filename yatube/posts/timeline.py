@@ -0,0 +1,204 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .utils import FEED_ORDERING, CursorPaginator
+
+TIMELINE_BATCH = getattr(settings, 'TIMELINE_BATCH_SIZE', 1000)
+TIMELINE_FIELDS = ('pub_date', 'post_id')
+
+
+def is_pulled(author_id):
+    """
+    Посты авторов, у которых подписчиков больше FEED_PULL_THRESHOLD,
+    не раскладываются по лентам, а подмешиваются при чтении.
+    """
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_PULL_THRESHOLD,
+    ).exists()
+
+
+def push_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.pk,
+                       pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=TIMELINE_BATCH,
+        ignore_conflicts=True,
+    )
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту подписчика все посты автора."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        batch_size=TIMELINE_BATCH,
+        ignore_conflicts=True,
+    )
+
+
+def fill(follows, **posts):
+    """
+    То же, что add_author для каждой подписки из follows, но одним
+    INSERT ... SELECT, без выборки постов в Python: для массовой
+    загрузки. posts — условия на посты авторов, например pk__gte=...
+    Возвращает число вставленных записей.
+    """
+    rows = follows.filter(
+        author__posts__isnull=False,
+        **{f'author__posts__{lookup}': value
+           for lookup, value in posts.items()},
+    ).exclude(
+        author__stats__followers_count__gt=settings.FEED_PULL_THRESHOLD,
+    ).order_by().values_list(
+        'user_id', 'author__posts__id', 'author__posts__pub_date'
+    )
+    sql, params = rows.query.sql_with_params()
+    ops = connection.ops
+    columns = ', '.join(
+        ops.quote_name(TimelineEntry._meta.get_field(name).column)
+        for name in ('user', 'post', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(TimelineEntry._meta.db_table)} ({columns}) '
+            f'{sql}{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            params,
+        )
+        return cursor.rowcount
+
+
+def rebalance(author_id, delta):
+    """
+    Вызывается после изменения числа подписчиков автора на delta.
+    Если оно пересекло FEED_PULL_THRESHOLD, посты автора переходят
+    между раскладкой и подмешиванием: при переходе вверх записи
+    автора удаляются из лент, при переходе вниз — раскладываются
+    всем подписчикам заново.
+    """
+    count = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    if count is None:
+        return
+    threshold = settings.FEED_PULL_THRESHOLD
+    pulled = count > threshold
+    if pulled == (count - delta > threshold):
+        return
+    if pulled:
+        TimelineEntry.objects.filter(post__author_id=author_id).delete()
+    else:
+        fill(Follow.objects.filter(author_id=author_id))
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def backfill(user_ids=None):
+    """
+    Досоздаёт недостающие записи для подписок.
+    Возвращает количество обработанных подписок.
+    """
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+    processed = 0
+    for user_id, author_id in follows.iterator():
+        add_author(user_id, author_id)
+        processed += 1
+    return processed
+
+
+def repair(user_ids=None):
+    """
+    Удаляет записи, не подкреплённые подпиской, и досоздаёт недостающие.
+    Возвращает (удалено записей, обработано подписок).
+    """
+    subscription = Follow.objects.filter(
+        user_id=OuterRef('user_id'), author_id=OuterRef('post__author_id')
+    )
+    stale = TimelineEntry.objects.annotate(
+        subscribed=Exists(subscription)
+    ).filter(subscribed=False)
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    with transaction.atomic():
+        removed, _ = TimelineEntry.objects.filter(
+            pk__in=stale.values('pk')
+        ).delete()
+    return removed, backfill(user_ids)
+
+
+class HybridFeedPaginator(CursorPaginator):
+    """
+    Лента подписок: посты обычных авторов читаются из TimelineEntry,
+    посты авторов с большим числом подписчиков — напрямую из Post.
+    Источники сливаются k-way merge, из каждого берётся не больше
+    одной страницы.
+    """
+
+    def __init__(self, user, object_list, per_page, **kwargs):
+        self.user = user
+        super().__init__(object_list, per_page, FEED_ORDERING, **kwargs)
+
+    def pulled_authors(self):
+        return list(Follow.objects.filter(
+            user=self.user,
+            author__stats__followers_count__gt=settings.FEED_PULL_THRESHOLD,
+        ).values_list('author_id', flat=True))
+
+    def pushed(self, pulled, values, backward, limit):
+        entries = self.user.timeline.exclude(
+            post__author_id__in=pulled
+        ).select_related('post__author', 'post__group')
+        ordering = tuple(f'-{field}' for field in TIMELINE_FIELDS)
+        if backward:
+            ordering = TIMELINE_FIELDS
+        if values is not None:
+            entries = entries.filter(
+                self.seek(values, backward, TIMELINE_FIELDS)
+            )
+        for entry in entries.order_by(*ordering)[:limit]:
+            yield entry.post
+
+    def pulled(self, author_id, values, backward, limit):
+        posts = Post.objects.select_related('author', 'group').filter(
+            author_id=author_id
+        ).order_by(*(self.reverse_ordering if backward else self.ordering))
+        if values is not None:
+            posts = posts.filter(self.seek(values, backward))
+        yield from posts[:limit]
+
+    def fetch(self, values, backward, limit):
+        pulled = self.pulled_authors()
+        sources = [self.pushed(pulled, values, backward, limit)]
+        sources.extend(self.pulled(author_id, values, backward, limit)
+                       for author_id in pulled)
+        merged = heapq.merge(
+            *sources,
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=not backward,
+        )
+        return list(islice(merged, limit))
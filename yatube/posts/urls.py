@@ -1,16 +1,21 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('search/', views.search, name='search'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('posts/<int:post_id>/comments/',
+         views.comments_more,
+         name='comments'),
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
@@ -36,4 +41,13 @@ urlpatterns = [
         views.post_delete,
         name='post_delete'
     ),
+    path(f'api/{api.API_VERSION}/posts/', api.feed, name='api_feed'),
+    path(f'api/{api.API_VERSION}/posts/<int:post_id>/', api.post_detail,
+         name='api_post'),
+    path(f'api/{api.API_VERSION}/posts/<int:post_id>/comments/',
+         api.post_comments, name='api_comments'),
+    path(f'api/{api.API_VERSION}/groups/<slug:slug>/posts/', api.group_feed,
+         name='api_group'),
+    path(f'api/{api.API_VERSION}/profiles/<str:username>/posts/',
+         api.profile_feed, name='api_profile'),
 ]
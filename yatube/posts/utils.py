@@ -1,10 +1,216 @@
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from functools import reduce
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import Comment
 
 POSTS_LMT = settings.POSTS_ON_PAGE_LMT
+FEED_ORDERING = ('-pub_date', '-id')
+COUNT_CACHE_TTL = settings.COUNT_CACHE_TTL
+COUNT_ESTIMATE_THRESHOLD = settings.COUNT_ESTIMATE_THRESHOLD
+
+
+def count_version_key(model):
+    return f'count_version:{model._meta.label_lower}'
+
+
+def invalidate_counts(model):
+    """Сбрасывает закэшированные количества для querysets модели."""
+    key = count_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+class CountingPaginator(Paginator):
+    """
+    Пагинатор с номерами страниц, который берёт COUNT(*) из кэша.
+    Для таблиц больше COUNT_ESTIMATE_THRESHOLD строк вместо точного
+    количества используется оценка из sqlite_stat1,
+    тогда count_is_estimate выставляется в True.
+    """
+    count_is_estimate = False
+
+    def estimate(self):
+        """Оценка числа строк неотфильтрованной таблицы или None."""
+        queryset = self.object_list
+        if queryset.query.where:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'sqlite':
+            return None
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s '
+                    'ORDER BY idx IS NOT NULL LIMIT 1',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+        except DatabaseError:
+            return None
+        return int(row[0].split()[0]) if row else None
+
+    def cache_key(self):
+        queryset = self.object_list
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f'{sql}{params!r}'.encode()).hexdigest()
+        version = cache.get_or_set(
+            count_version_key(queryset.model), 1, None
+        )
+        return f'count:{version}:{digest}'
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is not None and estimate > COUNT_ESTIMATE_THRESHOLD:
+            self.count_is_estimate = True
+            return estimate
+        key = self.cache_key()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, COUNT_CACHE_TTL)
+        return count
 
 
-def paginate_me(request, list_to_page):
-    paginator = Paginator(list_to_page, POSTS_LMT)
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинатор: страница выбирается условием по ключу сортировки
+    вместо OFFSET, а наличие соседних страниц определяется без COUNT(*).
+    Все поля ordering должны сортироваться в одном направлении.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 **kwargs):
+        self.ordering = tuple(ordering)
+        self.descending = self.ordering[0].startswith('-')
+        if any(field.startswith('-') != self.descending
+               for field in self.ordering):
+            raise ValueError('Поля ordering должны иметь одно направление')
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+        super().__init__(object_list.order_by(*self.ordering), per_page,
+                         **kwargs)
+
+    def encode_cursor(self, obj, direction):
+        values = []
+        for field in self.fields:
+            value = getattr(obj, field)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (direction, values) или None для битого курсора."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in ('next', 'prev'):
+                return None
+            if len(raw_values) != len(self.fields):
+                return None
+            model = self.object_list.model
+            values = [model._meta.get_field(field).to_python(value)
+                      for field, value in zip(self.fields, raw_values)]
+        except (ValueError, TypeError, binascii.Error,
+                FieldDoesNotExist, ValidationError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return direction, values
+
+    @property
+    def reverse_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}'
+                     for field in self.ordering)
+
+    def seek(self, values, backward, fields=None):
+        """
+        Условие «строго после ключа курсора» для лексикографического
+        порядка (f1, f2, ...); backward — в обратную сторону.
+        """
+        lookup = 'lt' if self.descending != backward else 'gt'
+        fields = fields or self.fields
+        conditions = []
+        for i, field in enumerate(fields):
+            equal = {f: v for f, v in zip(fields[:i], values[:i])}
+            conditions.append(
+                Q(**equal) & Q(**{f'{field}__{lookup}': values[i]})
+            )
+        return reduce(lambda a, b: a | b, conditions)
+
+    def fetch(self, values, backward, limit):
+        """
+        До limit строк после ключа values (None — с начала ленты)
+        в порядке обхода: прямом или, при backward, обратном.
+        """
+        queryset = self.object_list
+        if backward:
+            queryset = queryset.order_by(*self.reverse_ordering)
+        if values is not None:
+            queryset = queryset.filter(self.seek(values, backward))
+        return list(queryset[:limit])
+
+    def cursor_page(self, cursor):
+        """Страница после/до курсора; пустой или битый курсор — первая."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            backward, values = False, None
+        else:
+            backward, values = decoded[0] == 'prev', decoded[1]
+        rows = self.fetch(values, backward, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backward:
+            rows.reverse()
+            has_next, has_previous = bool(rows), has_more
+        else:
+            has_next, has_previous = has_more, decoded is not None
+        if not rows and decoded is not None:
+            return self.cursor_page(None)
+        page = Page(rows, None, self)
+        page.cursor = cursor if decoded is not None else ''
+        page.next_cursor = (self.encode_cursor(rows[-1], 'next')
+                            if has_next else '')
+        page.previous_cursor = (self.encode_cursor(rows[0], 'prev')
+                                if has_previous else '')
+        return page
+
+
+def paginate_me(request, list_to_page, ordering=FEED_ORDERING,
+                paginator=None):
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        # Совместимость со старыми ссылками вида ?page=N.
+        paginator = CountingPaginator(
+            list_to_page.order_by(*ordering), POSTS_LMT
+        )
+        return paginator.get_page(page_number)
+    if paginator is None:
+        paginator = CursorPaginator(list_to_page, POSTS_LMT, ordering)
+    return paginator.cursor_page(request.GET.get('cursor'))
+
+
+def comments_of(post_id):
+    """
+    Комментарии поста с авторами одним запросом; страница выбирается
+    курсором по (created, id) через индекс (post, created).
+    """
+    return Comment.objects.filter(post_id=post_id).select_related('author')
@@ -0,0 +1,104 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+IMAGE_VARIANT_WIDTHS = settings.IMAGE_VARIANT_WIDTHS
+IMAGE_VARIANT_RATIO = settings.IMAGE_VARIANT_RATIO
+IMAGE_VARIANT_QUALITY = settings.IMAGE_VARIANT_QUALITY
+VARIANTS_DIR = 'posts/variants'
+# Формат Pillow -> расширение; прочие форматы сохраняются в JPEG.
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+def original_format(name):
+    extension = os.path.splitext(name)[1].lstrip('.').lower()
+    for image_format, known in EXTENSIONS.items():
+        if extension == known or (known == 'jpg' and extension == 'jpeg'):
+            return image_format
+    return 'JPEG'
+
+
+def variant_name(name, width, image_format):
+    """Детерминированное имя: posts/variants/<имя>-<ширина>w.<расш>."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{VARIANTS_DIR}/{stem}-{width}w.{EXTENSIONS[image_format]}'
+
+
+def variant_height(width):
+    ratio_width, ratio_height = IMAGE_VARIANT_RATIO
+    return round(width * ratio_height / ratio_width)
+
+
+def formats_of(name):
+    """WebP и исходный формат картинки, без повторов."""
+    return tuple(dict.fromkeys(('WEBP', original_format(name))))
+
+
+def widths_for(source_width):
+    """
+    Ширины вариантов не больше ширины исходника, записанной в посте,
+    но хотя бы одна; для постов без записанных размеров — все.
+    """
+    if not source_width:
+        return IMAGE_VARIANT_WIDTHS
+    widths = tuple(width for width in IMAGE_VARIANT_WIDTHS
+                   if width <= source_width)
+    return widths or IMAGE_VARIANT_WIDTHS[:1]
+
+
+def srcset(name, image_format, source_width, storage):
+    return ', '.join(
+        f'{storage.url(variant_name(name, width, image_format))} '
+        f'{width}w'
+        for width in widths_for(source_width)
+    )
+
+
+def encode(image, image_format):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    options = {'quality': IMAGE_VARIANT_QUALITY}
+    if image_format == 'WEBP':
+        options['method'] = 6
+    elif image_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def generate(name, source_width, storage):
+    """
+    Создаёт недостающие варианты картинки для каждой ширины
+    widths_for(source_width) в WebP и исходном формате, с обрезкой
+    по центру до пропорций IMAGE_VARIANT_RATIO. Возвращает число
+    созданных файлов. Имена вариантов фиксированы, поэтому они пишутся
+    через storage.write, минуя переименование при save.
+    """
+    missing = [
+        (width, image_format)
+        for width in widths_for(source_width)
+        for image_format in formats_of(name)
+        if not storage.exists(variant_name(name, width, image_format))
+    ]
+    if not missing:
+        return 0
+    with storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    for width, image_format in missing:
+        frame = ImageOps.fit(image, (width, variant_height(width)),
+                             Image.Resampling.LANCZOS)
+        storage.write(variant_name(name, width, image_format),
+                      ContentFile(encode(frame, image_format)))
+    return len(missing)
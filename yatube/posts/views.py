@@ -1,24 +1,39 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
+from . import thumbnails
+from .etags import (comments_etag, group_etag, index_etag, post_etag,
+                    profile_etag)
 from .forms import PostForm, CommentForm
+from .generations import GLOBAL_SCOPE, author_scope, group_scope
 from .models import Comment, Group, Post, Follow
-from .utils import paginate_me
+from .search import SearchResults, search_available
+from .streaming import render_listing
+from .suggestions import AUTOCOMPLETE_LIMIT, suggest
+from .timeline import HybridFeedPaginator
+from .utils import POSTS_LMT, comments_of, paginate_me
 
 
 User = get_user_model()
+COMMENTS_ORDERING = ('-created', '-id')
 
 
+@condition(etag_func=index_etag)
 def index(request):
     list_to_page = Post.objects.select_related('author', 'group').all()
     page_obj = paginate_me(request, list_to_page)
     context = {
         'page_obj': page_obj,
+        'feed_scope': GLOBAL_SCOPE,
     }
-    return render(request, 'posts/index.html', context)
+    return render_listing(request, 'posts/index.html', context)
 
 
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     list_to_page = group.posts.select_related('author').all()
@@ -26,12 +41,16 @@ def group_posts(request, slug):
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_scope': group_scope(group.pk),
     }
-    return render(request, 'posts/group_list.html', context)
+    return render_listing(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     list_to_page = author.posts.select_related('group').all()
     page_obj = paginate_me(request, list_to_page)
     following = (request.user.is_authenticated
@@ -40,26 +59,65 @@ def profile(request, username):
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        'feed_scope': author_scope(author.pk),
     }
-    return render(request, 'posts/profile.html', context)
+    return render_listing(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.prefetch_related('commented'),
+        Post.objects.select_related('author__stats', 'group'),
         pk=post_id
     )
     form = CommentForm()
-    list_to_page = post.commented.all()
-    comments = paginate_me(request, list_to_page)
+    comments = paginate_me(request, comments_of(post.pk), COMMENTS_ORDERING)
     context = {
         'post': post,
+        'post_id': post.pk,
         'comments': comments,
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@condition(etag_func=comments_etag)
+def comments_more(request, post_id):
+    comments = paginate_me(request, comments_of(post_id), COMMENTS_ORDERING)
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    if search_available():
+        results = SearchResults(query)
+    else:
+        results = Post.objects.select_related('author', 'group').filter(
+            text__icontains=query
+        ) if query else Post.objects.none()
+    paginator = Paginator(results, POSTS_LMT)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def autocomplete(request):
+    try:
+        limit = int(request.GET.get('limit', AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    return JsonResponse(
+        {'results': suggest(request.GET.get('q', ''), limit)}
+    )
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None,)
@@ -68,6 +126,7 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    thumbnails.schedule(post.image)
     return redirect('posts:profile', post.author.username)
 
 
@@ -79,7 +138,9 @@ def post_edit(request, post_id):
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=post)
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -118,11 +179,11 @@ def comment_delete(request, comment_id, post_id):
 
 @login_required
 def follow_index(request):
-    follower = request.user
     list_to_page = Post.objects.select_related('author', 'group').filter(
-        author__following__user=follower
+        author__following__user=request.user
     )
-    page_obj = paginate_me(request, list_to_page)
+    paginator = HybridFeedPaginator(request.user, list_to_page, POSTS_LMT)
+    page_obj = paginate_me(request, list_to_page, paginator=paginator)
     context = {
         'page_obj': page_obj,
     }
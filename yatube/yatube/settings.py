@@ -28,13 +28,92 @@ DEBUG_TOOLBAR_CONFIG = {
 
 POSTS_ON_PAGE_LMT = 10
 
+FEED_PULL_THRESHOLD = 1000
+
+COUNT_CACHE_TTL = 60 * 5
+
+COUNT_ESTIMATE_THRESHOLD = 100000
+
+FEED_CACHE_TTL = 60 * 60 * 6
+
+# Лёгкая разметка в постах: **жирный**, *курсив*, `код`, [ссылки](...).
+# После переключения — rerender_posts.
+POST_MARKDOWN = os.getenv('POST_MARKDOWN') == '1'
+
+# Ленты отдаются по частям: шапка сразу, затем карточки постов.
+STREAMING_RENDER = os.getenv('STREAMING_RENDER') == '1'
+
+AUTOCOMPLETE_LIMIT = 10
+
+# Наибольший ?limit= страницы JSON API.
+API_MAX_LIMIT = 100
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.PendingThumbnailBackend'
+
+THUMBNAIL_KVSTORE = 'posts.thumbnails.PrefetchKVStore'
+
+# Должны совпадать с тегами {% thumbnail %} в шаблонах постов.
+THUMBNAIL_GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+THUMBNAIL_WORKERS = 2
+
+THUMBNAIL_WAIT = False
+
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+
+IMAGE_VARIANT_RATIO = (960, 339)
+
+IMAGE_VARIANT_QUALITY = 80
+
+IMAGE_VARIANT_SIZES = '(max-width: 992px) 100vw, 960px'
+
+IMAGE_MAX_SIDE = 2560
+
+IMAGE_MAX_PIXELS = 50_000_000
+
+IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+IMAGE_INGEST_WORKERS = 2
+
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 6,
+    'posts:profile': 8,
+    'posts:post_detail': 7,
+    'posts:comments': 4,
+    'posts:follow_index': 5,
+    'posts:search': 5,
+    'posts:autocomplete': 1,
+}
+
+QUERY_REPEAT_THRESHOLD = 5
+
+# Запись SQL и разбор форм запросов стоят времени на каждом запросе:
+# по умолчанию только при DEBUG. В тестах включается вместе
+# с QUERY_BUDGET_STRICT, см. core.runner.
+QUERY_RECORDING = os.getenv('QUERY_RECORDING', '1' if DEBUG else '0') == '1'
+
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT') == '1'
+
+# Время отрисовки шаблонов и тегов в лог core.templates и Server-Timing.
+TEMPLATE_PROFILING = os.getenv('TEMPLATE_PROFILING') == '1'
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+TEST_RUNNER = 'core.runner.TestRunner'
+
+# Тесты подменяют файл кэша на временный, см. core.runner.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
         'OPTIONS': {
-            'MAX_ENTRIES': 100
+            'MAX_ENTRIES': 10000,
+            'MAX_BYTES': 64 * 1024 * 1024,
         }
     }
 }
@@ -55,6 +134,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.TemplateProfileMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -72,6 +153,12 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# 'nginx' — X-Accel-Redirect на internal location MEDIA_ACCEL_PREFIX,
+# 'apache' — X-Sendfile; пусто — файлы отдаёт Django.
+MEDIA_SERVER = os.getenv('MEDIA_SERVER', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_MAX_AGE = 60 * 60
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
@@ -91,6 +178,16 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Вне DEBUG шаблоны разбираются один раз на процесс.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
@@ -127,6 +224,10 @@ USE_TZ = True
 
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# collectstatic пишет имена с хэшем, манифест и копии .gz.
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = 60 * 60
 
 LOGIN_URL = 'users:login'
 
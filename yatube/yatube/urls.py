@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.conf import settings
-from django.conf.urls.static import static
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.media import serve_media
+from core.staticfiles import serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,6 +11,10 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', serve_media,
+            name='media'),
+    re_path(rf'^{settings.STATIC_URL.lstrip("/")}(?P<path>.+)$',
+            serve_static, name='static'),
 ]
 
 handler404 = 'core.views.page_not_found'
@@ -19,6 +25,3 @@ if settings.DEBUG:
     import debug_toolbar
 
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )